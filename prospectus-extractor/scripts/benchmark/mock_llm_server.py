@@ -0,0 +1,96 @@
+"""
+Fake OpenAI-compatible LLM server (plus Ollama /api/embed) for offline benchmarks.
+
+Each chat completion waits `--latency` seconds (± `--jitter`) while holding one of
+`--slots` slots, like a GPU server with a fixed number of parallel sequences.
+Responses are valid JSON for every extraction response model: list models get a
+single synthetic entity, the rest an empty object. `--invalid-rate` returns
+malformed JSON for that fraction of requests to exercise instructor re-asks.
+
+Usage: python scripts/benchmark/mock_llm_server.py [--port 8099] [--latency 0.5] [--slots 4]
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+
+import numpy as np
+from aiohttp import web
+
+
+def _estimate_tokens(text: str) -> int:
+    return -(-len(text) // 4)
+
+
+def create_app(latency: float, jitter: float, slots: int, invalid_rate: float, embedding_dim: int) -> web.Application:
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    slot_semaphore = asyncio.Semaphore(slots)
+    counter = itertools.count(1)
+    stats = {"chat_completions": 0, "embed_requests": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    async def chat_completions(request: web.Request) -> web.Response:
+        body = await request.json()
+        number = next(counter)
+        prompt = "\n".join(str(m.get("content") or "") for m in body.get("messages", []))
+        async with slot_semaphore:
+            stats["in_flight"] += 1
+            stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+            try:
+                await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+            finally:
+                stats["in_flight"] -= 1
+        stats["chat_completions"] += 1
+
+        if random.random() < invalid_rate:
+            content = '{"items": [ truncated'
+        elif '"items"' in prompt:
+            content = json.dumps({"items": [{"name": f"Synthetic entity {number}"}]})
+        else:
+            content = "{}"
+        prompt_tokens = _estimate_tokens(prompt)
+        completion_tokens = _estimate_tokens(content)
+        return web.json_response({
+            "id": f"chatcmpl-mock-{number}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    async def embed(request: web.Request) -> web.Response:
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        stats["embed_requests"] += 1
+        vectors = np.random.default_rng(len(texts)).standard_normal((len(texts), embedding_dim)).astype(np.float32)
+        return web.json_response({"model": body.get("model"), "embeddings": vectors.tolist()})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/api/embed", embed)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--slots", type=int, default=4, help="Completions served in parallel")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Fraction of malformed JSON responses")
+    parser.add_argument("--embedding-dim", type=int, default=1024)
+    args = parser.parse_args()
+    web.run_app(
+        create_app(args.latency, args.jitter, args.slots, args.invalid_rate, args.embedding_dim),
+        host=args.host, port=args.port, print=None,
+    )
@@ -0,0 +1,147 @@
+"""
+Synthetic prospectus PDFs for benchmarks: section headings, prose paragraphs and
+ruled fee tables, written as a plain PDF 1.4 file so no PDF library is needed.
+Usage: python scripts/benchmark/synthetic_pdf.py out.pdf [--pages 100] [--seed 7]
+"""
+import random
+import argparse
+import textwrap
+from typing import List, Tuple
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 54
+LEADING = 13
+
+SECTIONS = {
+    "DEPARTMENT OF {}": ["Computer Science", "Electrical Engineering", "Mathematics", "Physics",
+                         "Management Sciences", "Civil Engineering", "Economics", "Chemistry"],
+    "FACILITIES": [""],
+    "FEE STRUCTURE": [""],
+    "ADMISSION REQUIREMENTS": [""],
+    "FACULTY OF {}": ["Engineering", "Basic Sciences", "Social Sciences"],
+}
+
+VOCABULARY = {
+    "DEPARTMENT OF {}": "The department offers a Bachelor of Science program of four years with 136 credit hours "
+                        "covering core courses, electives, laboratories and a final year project supervised by "
+                        "faculty members engaged in research",
+    "FACULTY OF {}": "The faculty comprises departments offering undergraduate and graduate degree programs with "
+                     "modern curriculum designed in consultation with industry and accredited by the council",
+    "FACILITIES": "The campus provides a central library with digital resources, computer laboratories, hostels "
+                  "for male and female students, sports complex, cafeteria, medical centre and transport",
+    "FEE STRUCTURE": "Tuition fee is charged per semester and admission fee is paid once at the time of "
+                     "enrolment while hostel charges and security deposit are refundable as per policy",
+    "ADMISSION REQUIREMENTS": "Candidates must have passed intermediate or equivalent examination with at least "
+                              "sixty percent marks and qualify the entry test before the application deadline",
+}
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _paragraph(rng: random.Random, section: str) -> str:
+    words = VOCABULARY[section].split()
+    return " ".join(rng.choice(words) for _ in range(rng.randint(40, 110))).capitalize() + "."
+
+
+def _fee_table(rng: random.Random) -> List[List[str]]:
+    programs = ["BS Computer Science", "BS Electrical Engineering", "BS Mathematics", "BBA", "BS Economics"]
+    rows = [["Program", "Admission Fee", "Tuition Fee per Semester", "Hostel"]]
+    for program in rng.sample(programs, rng.randint(3, len(programs))):
+        rows.append([program, f"Rs. {rng.randint(10, 40) * 1000:,}", f"Rs. {rng.randint(60, 200) * 1000:,}",
+                     f"Rs. {rng.randint(20, 60) * 1000:,}"])
+    return rows
+
+
+def _text(ops: List[str], x: float, y: float, text: str, font: str = "F1", size: int = 10) -> None:
+    ops.append(f"BT /{font} {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET")
+
+
+def _page_content(rng: random.Random, page_number: int, heading: str, section: str, with_table: bool) -> bytes:
+    ops: List[str] = []
+    y = PAGE_HEIGHT - MARGIN
+    _text(ops, MARGIN, PAGE_HEIGHT - 30, "Undergraduate Prospectus 2025", size=8)
+    if heading:
+        _text(ops, MARGIN, y, heading, font="F2", size=14)
+        y -= 2 * LEADING
+
+    if with_table:
+        rows = _fee_table(rng)
+        widths = [180, 100, 130, 94]
+        row_height = 20
+        for row in rows:
+            x = MARGIN
+            for width, cell in zip(widths, row):
+                ops.append(f"{x:.1f} {y - row_height:.1f} {width} {row_height} re S")
+                _text(ops, x + 4, y - row_height + 6, cell, size=9)
+                x += width
+            y -= row_height
+        y -= 2 * LEADING
+
+    while y > MARGIN + 6 * LEADING:
+        for line in textwrap.wrap(_paragraph(rng, section), 95):
+            _text(ops, MARGIN, y, line)
+            y -= LEADING
+        y -= LEADING  # blank line between paragraphs
+
+    _text(ops, PAGE_WIDTH / 2, 30, str(page_number), size=8)
+    return "\n".join(ops).encode("latin-1")
+
+
+def generate_prospectus(pages: int, seed: int = 7) -> bytes:
+    """A `pages`-page prospectus; a new section starts every few pages and fee sections carry ruled tables."""
+    rng = random.Random(seed)
+    contents: List[bytes] = []
+    section, heading, remaining = "", "", 0
+    for number in range(1, pages + 1):
+        new_section = remaining == 0
+        if new_section:
+            section = rng.choice(list(SECTIONS))
+            heading = section.format(rng.choice(SECTIONS[section])) if "{}" in section else section
+            remaining = rng.randint(2, 6)
+        remaining -= 1
+        with_table = section == "FEE STRUCTURE" and rng.random() < 0.6
+        contents.append(_page_content(rng, number, heading if new_section else "", section, with_table))
+    return _write_pdf(contents)
+
+
+def _write_pdf(contents: List[bytes]) -> bytes:
+    # Object numbers: 1 catalog, 2 page tree, 3-4 fonts, then (page, content) pairs
+    objects: List[Tuple[int, bytes]] = []
+    page_ids = [5 + 2 * i for i in range(len(contents))]
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append((1, b"<< /Type /Catalog /Pages 2 0 R >>"))
+    objects.append((2, f"<< /Type /Pages /Kids [{kids}] /Count {len(contents)} >>".encode()))
+    objects.append((3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"))
+    objects.append((4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"))
+    for page_id, content in zip(page_ids, contents):
+        objects.append((page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        ).encode()))
+        objects.append((page_id + 1, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for number, body in objects:
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    size = max(offsets) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for number in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_offset)
+    return bytes(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic prospectus PDF")
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    with open(args.output, "wb") as f:
+        f.write(generate_prospectus(args.pages, args.seed))
+    print(f"Wrote {args.pages} pages to {args.output}")
@@ -0,0 +1,122 @@
+"""
+Micro-benchmark for ChunkerService: chunking throughput (pages/second) of the
+precompiled classifier versus the original per-call `re` implementation.
+Usage: python scripts/benchmark_chunker.py [--pages 400] [--repeat 5]
+"""
+import re
+import sys
+import os
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.chunker import ChunkerService
+from src.services.document_parser import ParsedPage, ParsedDocument
+
+
+class LegacyChunkerService(ChunkerService):
+    """The string-pattern implementation ChunkerService used before precompilation."""
+
+    def _preprocess_text(self, text: str) -> str:
+        for pattern in self.NOISE_PATTERNS:
+            text = re.sub(pattern, "", text, flags=re.MULTILINE | re.IGNORECASE)
+        lines = text.split('\n')
+        cleaned_lines = []
+        prev_line = None
+        for line in lines:
+            stripped = line.strip()
+            if prev_line and self._is_near_duplicate(stripped, prev_line):
+                continue
+            cleaned_lines.append(line)
+            if stripped:
+                prev_line = stripped
+        text = '\n'.join(cleaned_lines)
+        text = re.sub(r'\n{4,}', '\n\n\n', text)
+        text = re.sub(r'[ \t]+', ' ', text)
+        return text.strip()
+
+    def _detect_header(self, text: str):
+        text = text.strip()
+        if len(text) > 150:
+            return None
+        for pattern in self.HEADER_PATTERNS + self.HEADER_PREFIX_PATTERNS:
+            if re.match(pattern, text, re.IGNORECASE):
+                return text
+        return None
+
+    def _classify_section(self, text: str, current_section: str) -> str:
+        text_sample = text[:1500]
+        scores = {}
+        for section, patterns in self.SECTION_PATTERNS.items():
+            score = 0
+            for pattern in patterns:
+                score += len(re.findall(pattern, text_sample, re.IGNORECASE))
+            if score > 0:
+                scores[section] = score
+        if scores:
+            return max(scores, key=scores.get)
+        return current_section
+
+
+SAMPLE_SENTENCES = [
+    "The University offers a vibrant campus life with modern facilities for all students.",
+    "The Fee Structure for the academic year is given below; Tuition Fee is Rs. 150,000 per semester.",
+    "Admission Criteria: candidates must pass the Entry Test and appear on the Merit List.",
+    "The Department of Computer Science offers BS Computer Science and BS Software Engineering.",
+    "Year 1 Semester 2 courses carry 3 Credit Hours each, see Course No CS-101.",
+    "Students may use the Central Library, Hostel accommodation and Sports Facilities.",
+    "Contact Us: Phone: 042-111-000-000 Email: admissions@example.edu.pk",
+    "Research is supported through dedicated Research Centers and laboratories across faculties.",
+]
+HEADINGS = ["DEPARTMENT OF ELECTRICAL ENGINEERING", "FEE STRUCTURE", "ADMISSIONS", "B.Sc. Mathematics"]
+
+
+def build_document(page_count: int, seed: int = 7) -> ParsedDocument:
+    rng = random.Random(seed)
+    pages = []
+    for number in range(1, page_count + 1):
+        blocks = []
+        for _ in range(rng.randint(4, 10)):
+            if rng.random() < 0.15:
+                blocks.append(rng.choice(HEADINGS))
+            else:
+                blocks.append(" ".join(rng.choice(SAMPLE_SENTENCES) for _ in range(rng.randint(1, 8))))
+        blocks.append(f"Undergraduate Prospectus Spring 2026 {number}")
+        tables = [[["Program", "Tuition Fee"], ["BS CS", "Rs. 150,000"]]] if number % 6 == 0 else []
+        pages.append(ParsedPage(page_number=number, text="\n\n".join(blocks), tables=tables))
+    return ParsedDocument(total_pages=page_count, pages=pages)
+
+
+def measure(service: ChunkerService, document: ParsedDocument, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        service.chunk_document(document)
+        best = min(best, time.perf_counter() - start)
+    return document.total_pages / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    document = build_document(args.pages)
+    legacy, current = LegacyChunkerService(), ChunkerService()
+
+    legacy_chunks = legacy.chunk_document(document)
+    current_chunks = current.chunk_document(document)
+    same = [(c.text, c.section_label) for c in legacy_chunks] == [(c.text, c.section_label) for c in current_chunks]
+    print(f"Chunks: {len(current_chunks)} (identical to legacy output: {same})")
+
+    before = measure(legacy, document, args.repeat)
+    after = measure(current, document, args.repeat)
+    print(f"Before: {before:8.1f} pages/s")
+    print(f"After:  {after:8.1f} pages/s  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
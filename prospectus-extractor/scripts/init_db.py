@@ -1,14 +1,15 @@
 """
 Run this script once to create the prospectus tables and enable pgvector.
-Usage: python -m scripts.init_db
+Usage: python -m scripts.init_db [--index-type hnsw|ivfflat] [--m 16] [--ef-construction 64] [--lists 100] [--rebuild-index]
 """
 import sys
+import argparse
 sys.path.insert(0, "src")
 from sqlalchemy import text
 from config import settings
-from models.db import Base, get_engine
+from models.db import Base, get_engine, create_vector_index, add_missing_columns
 
-def init_database():
+def init_database(args):
     engine = get_engine(settings.database_url)
 
     with engine.connect() as conn:
@@ -16,7 +17,24 @@ def init_database():
         conn.commit()
         print("pgvector extension enables")
     Base.metadata.create_all(engine)
+    add_missing_columns(engine)
+
+    create_vector_index(
+        engine,
+        index_type=args.index_type,
+        m=args.m,
+        ef_construction=args.ef_construction,
+        lists=args.lists,
+        rebuild=args.rebuild_index,
+    )
+    print(f"{args.index_type} index on prospectus_vectors.embedding ready")
     print("\n\n Database initialization complete\n")
 
 if __name__ == "__main__":
-    init_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create prospectus tables and the vector index")
+    parser.add_argument("--index-type", choices=["hnsw", "ivfflat"], default=settings.vector_index_type)
+    parser.add_argument("--m", type=int, default=settings.vector_index_m, help="HNSW max connections per node")
+    parser.add_argument("--ef-construction", type=int, default=settings.vector_index_ef_construction, help="HNSW build candidate list size")
+    parser.add_argument("--lists", type=int, default=settings.vector_index_lists, help="IVFFlat list count")
+    parser.add_argument("--rebuild-index", action="store_true", help="Drop and recreate the index with the given parameters")
+    init_database(parser.parse_args())
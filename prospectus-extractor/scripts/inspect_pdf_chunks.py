@@ -10,7 +10,12 @@ from src.services.chunker import chunker_service
 
 logging.basicConfig(level=logging.INFO)
 
-async def inspect():
+def parse_page_range(arg):
+    """'40-45' -> range(40, 46); '12' -> range(12, 13)"""
+    start, _, end = arg.partition("-")
+    return range(int(start), int(end or start) + 1)
+
+async def inspect(pages=None):
     pdf_path = "data/UG_WHOLE_Spring_26_08_12_2025.pdf"
     if not os.path.exists(pdf_path):
         print("File not found")
@@ -19,7 +24,7 @@ async def inspect():
     print("Parsing...")
     with open(pdf_path, "rb") as f:
         pdf_bytes = f.read()
-    parsed = await document_parser_service.parse_pdf(pdf_bytes)
+    parsed = await document_parser_service.parse_pdf(pdf_bytes, pages=pages)
     
     print("Chunking...")
     chunks = chunker_service.chunk_document(parsed)
@@ -38,4 +43,5 @@ async def inspect():
     print("Dumped to scripts/test/dept_chunks_dump.txt")
 
 if __name__ == "__main__":
-    asyncio.run(inspect())
+    # Optional page range to parse only part of the prospectus, e.g. `python scripts/inspect_pdf_chunks.py 40-45`
+    asyncio.run(inspect(parse_page_range(sys.argv[1]) if len(sys.argv) > 1 else None))
@@ -0,0 +1,77 @@
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.services.blob_storage import BlobStorageService
+
+logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s')
+
+# Defaults to Azurite (`azurite-blob --loose`); set AZURE_STORAGE_TEST_CONNECTION_STRING for a real account
+CONNECTION_STRING = os.environ.get("AZURE_STORAGE_TEST_CONNECTION_STRING", "UseDevelopmentStorage=true")
+
+
+async def test_ranged_download():
+    # Small chunks so a 3MB payload takes a dozen ranged GETs
+    storage = BlobStorageService(CONNECTION_STRING, container_name="download-test", max_concurrency=4,
+                                 chunk_size=256 * 1024)
+    container = await storage._get_container_client()
+    if not await container.exists():
+        await container.create_container()
+
+    payload = os.urandom(3 * 1024 * 1024 + 123)
+    blob_name = "test/large.pdf"
+    await storage.upload(blob_name, payload)
+
+    path = await storage.download_to_file(blob_name)
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == payload, "download_to_file content mismatch"
+        print(f"download_to_file OK: {path}")
+    finally:
+        os.unlink(path)
+
+    streamed = bytearray()
+    pieces = 0
+    async for chunk in storage.download_stream(blob_name):
+        streamed.extend(chunk)
+        pieces += 1
+    assert bytes(streamed) == payload, "download_stream content mismatch"
+    print(f"download_stream OK: {pieces} chunks")
+
+    await storage.delete(blob_name)
+    await storage.close()
+
+
+async def test_batch_operations():
+    storage = BlobStorageService(CONNECTION_STRING, container_name="download-test", block_size=256 * 1024)
+    container = await storage._get_container_client()
+    if not await container.exists():
+        await container.create_container()
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+        f.write(os.urandom(1024 * 1024))
+        f.flush()
+        names = [f"batch/prospectus-{i}.pdf" for i in range(20)]
+        await asyncio.gather(*[storage.upload_file(name, f.name) for name in names])
+
+    listed = [name async for name in storage.iter_blobs(prefix="batch/", page_size=7)]
+    assert sorted(listed) == sorted(names), "iter_blobs missed blobs"
+    print(f"iter_blobs OK: {len(listed)} blobs")
+
+    exists = await storage.exists_many(names + ["batch/missing.pdf"])
+    assert all(exists[name] for name in names) and not exists["batch/missing.pdf"]
+    print("exists_many OK")
+
+    deleted = await storage.delete_many(names + ["batch/missing.pdf"])
+    assert deleted == len(names), f"delete_many deleted {deleted}"
+    print(f"delete_many OK: {deleted} deleted")
+    await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_ranged_download())
+    asyncio.run(test_batch_operations())
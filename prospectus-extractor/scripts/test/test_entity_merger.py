@@ -0,0 +1,48 @@
+import sys
+import os
+
+# Add project root to python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.models.schema import Department, Facility, Program
+from src.services.entity_merger import EntityMerger
+
+
+def test_numbered_names_stay_separate():
+    merger = EntityMerger(threshold=0.93)
+
+    facilities = merger.merge_facilities([
+        Facility(name="Computer Lab 10"),
+        Facility(name="Computer Lab 11"),
+        Facility(name="Hostel Block 2"),
+        Facility(name="Hostel Block 3"),
+        Facility(name="Computer Lab 10", description="Fifty workstations"),
+    ])
+    names = [f.name for f in facilities]
+    print(f"Facilities: {names}")
+    assert names == ["Computer Lab 10", "Computer Lab 11", "Hostel Block 2", "Hostel Block 3"], names
+    assert facilities[0].description == "Fifty workstations"
+
+    programs = merger.merge_programs([Program(name="BS Phase 1"), Program(name="BS Phase 2"), Program(name="BS Phase")])
+    print(f"Programs: {[p.name for p in programs]}")
+    assert len(programs) == 3
+
+
+def test_near_duplicates_merge():
+    merger = EntityMerger(threshold=0.93)
+    departments = merger.merge_departments([
+        Department(name="Department of Computer Science", source_chunk_ids=["a"]),
+        Department(name="Computer Science Department", source_chunk_ids=["b"]),
+        Department(name="Dept. of Computer Sciences", source_chunk_ids=["c"]),
+        Department(name="Department of Electrical Engineering"),
+        Department(name="Department of Electronic Engineering"),
+    ])
+    print(f"Departments: {[(d.name, d.source_chunk_ids) for d in departments]}")
+    assert len(departments) == 3
+    assert departments[0].source_chunk_ids == ["a", "b", "c"]
+
+
+if __name__ == "__main__":
+    test_numbered_names_stay_separate()
+    test_near_duplicates_merge()
+    print("Entity merger checks passed")
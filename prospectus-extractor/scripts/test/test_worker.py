@@ -0,0 +1,56 @@
+import sys
+import os
+import asyncio
+import logging
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.worker import ExtractionWorker
+from src.services.job_queue import InMemoryJobQueue, ExtractionJob
+
+logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s')
+
+
+class FakePipeline:
+    """Stands in for IngestionPipeline: sleeps like a long LLM phase, fails some jobs."""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+    async def run(self, job: ExtractionJob):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(random.uniform(0.5, 1.5))
+            if job.blob_name.startswith("broken"):
+                raise RuntimeError("simulated parse failure")
+        finally:
+            self.running -= 1
+
+
+async def test_worker():
+    queue = InMemoryJobQueue()
+    for i in range(8):
+        queue.send(ExtractionJob(ingestion_id=f"job-{i}", blob_name=f"prospectus-{i}.pdf"))
+    queue.send(ExtractionJob(ingestion_id="job-broken", blob_name="broken.pdf"))
+
+    pipeline = FakePipeline()
+    worker = ExtractionWorker(queue, pipeline, concurrency=3, max_wait_time=0.2,
+                              lock_renew_interval=0.3, max_delivery_count=2)
+    stop = asyncio.Event()
+    run = asyncio.create_task(worker.run(stop))
+    while len(queue.completed) + len(queue.dead_lettered) < 9:
+        await asyncio.sleep(0.1)
+    stop.set()
+    await run
+
+    print(f"Completed: {len(queue.completed)}")
+    print(f"Abandoned then retried: {[j.ingestion_id for j in queue.abandoned]}")
+    print(f"Dead-lettered: {[j.ingestion_id for j in queue.dead_lettered]}")
+    print(f"Lock renewals: {queue.lock_renewals}")
+    print(f"Peak concurrency: {pipeline.peak} (limit 3)")
+
+if __name__ == "__main__":
+    asyncio.run(test_worker())
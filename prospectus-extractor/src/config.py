@@ -1,5 +1,19 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import BaseModel, Field
+
+
+class LLMBackendConfig(BaseModel):
+    """One OpenAI-compatible LLM endpoint in settings.llm_backends."""
+    name: str
+    base_url: str
+    model: str
+    api_key: str = "ollama"
+    kind: str = Field(default="ollama", description="'ollama' (context length read from the model's num_ctx) or 'openai' for hosted endpoints")
+    context_window: Optional[int] = Field(default=None, description="Context length the server runs with; defaults to the Ollama model's num_ctx, or llm_context_window for hosted endpoints")
+    max_concurrency: Optional[int] = Field(default=None, description="Starting in-flight limit; defaults to llm_max_concurrency")
+    cost_per_1k_tokens: float = Field(default=0.0, description="Price per 1k prompt tokens; 0 for self-hosted")
 
 
 class Settings(BaseSettings):
@@ -9,26 +23,94 @@ class Settings(BaseSettings):
     # Azure Storage
     azure_storage_connection_string: str = Field(..., description="Azure Storage connection")
     azure_storage_container: str = Field(default="prospectuses")
+    blob_download_max_concurrency: int = Field(default=4, description="Parallel ranged GETs per download")
+    blob_download_chunk_size: int = Field(default=4 * 1024 * 1024, description="Bytes per ranged GET")
+    blob_download_dir: str = Field(default="", description="Directory for downloaded PDFs; empty uses the system temp dir")
+    blob_upload_max_concurrency: int = Field(default=4, description="Parallel block uploads per blob")
+    blob_upload_block_size: int = Field(default=4 * 1024 * 1024, description="Bytes per staged block")
+    blob_batch_concurrency: int = Field(default=16, description="Concurrent requests for exists_many")
 
     # Azure Service Bus
     azure_servicebus_connection_string: str = Field(..., description="Service Bus connection")
     azure_servicebus_queue_name: str = Field(default="prospectus-extraction-jobs")
 
+    # Worker
+    worker_concurrency: int = Field(default=2, description="Ingestions processed at once")
+    # Prefetched messages wait in the client buffer without lock renewal and their locks expire
+    # during long jobs, so the worker clamps this to worker_concurrency
+    worker_prefetch_count: int = Field(default=0, description="Messages buffered ahead of processing; at most worker_concurrency")
+    worker_max_wait_time: float = Field(default=30.0, description="Seconds to wait for messages per receive")
+    worker_lock_renew_interval: float = Field(default=60.0, description="Seconds between message lock renewals")
+    worker_max_delivery_count: int = Field(default=3, description="Deliveries before a failing job is dead-lettered")
+    metrics_port: int = Field(default=0, description="Port for the Prometheus /metrics endpoint; 0 disables it")
+    checkpoint_dir: str = Field(default=".cache/checkpoints", description="Per-ingestion stage checkpoints")
+    incremental_extraction: bool = Field(default=True, description="Re-extract only chunks changed since the university's previous ingestion")
+
     # LLM Service (Ollama)
     llm_base_url: str = Field(default="http://localhost:11434/v1")
     llm_model_name: str = Field(default="llama3.1:8b")
     groq_api_key: str = Field(default="", description="Groq API Key")
+    groq_base_url: str = Field(default="https://api.groq.com/openai/v1")
+    groq_model_name: str = Field(default="llama-3.3-70b-versatile")
+    groq_cost_per_1k_tokens: float = Field(default=0.0006)
+    llm_backends: List[LLMBackendConfig] = Field(
+        default_factory=list,
+        description="JSON list of LLM backends; empty uses llm_base_url, plus Groq when groq_api_key is set",
+    )
+    llm_router_cost_weight: float = Field(default=1000.0, description="Seconds of expected completion time worth one unit of backend cost")
+    llm_hedge_percentile: float = Field(default=0.95, description="Latency percentile after which a request is hedged on another backend; 0 disables")
+    llm_hedge_min_samples: int = Field(default=20, description="Latency samples a backend needs before its requests are hedged")
+    llm_failover_attempts: int = Field(default=3, description="Distinct backends tried for one request")
+    llm_backend_cooldown: float = Field(default=30.0, description="Seconds a failing backend is avoided, doubling per consecutive failure")
     llm_temperature: float = Field(default=0.1)
     llm_max_tokens: int = Field(default=4096)
+    llm_max_concurrency: int = Field(default=5, description="Max in-flight LLM requests; the starting limit when adaptive")
+    llm_adaptive_concurrency: bool = Field(default=True, description="Adapt the in-flight limit to latency and overload responses (AIMD)")
+    llm_concurrency_min: int = Field(default=1, description="Lower bound of the adaptive limit")
+    llm_concurrency_max: int = Field(default=32, description="Upper bound of the adaptive limit")
+    llm_latency_tolerance: float = Field(default=1.5, description="Recent/baseline latency ratio above which the adaptive limit shrinks")
+    llm_context_window: int = Field(default=16384, description="Context length of hosted backends; batches are packed for the smallest backend context")
+    llm_context_margin: int = Field(default=256, description="Tokens held back for chat template overhead")
+    llm_tokenizer: str = Field(default="", description="Hugging Face tokenizer matching llm_model_name; empty uses tiktoken")
+
+    # LLM response cache
+    llm_cache_enabled: bool = Field(default=True)
+    llm_cache_path: str = Field(default=".cache/llm_responses.sqlite3")
+    llm_cache_max_bytes: int = Field(default=512 * 1024 * 1024)
+
+    # Chunk selection for extraction: "keyword" or "semantic" (embedding similarity)
+    extraction_selection_mode: str = Field(default="keyword")
+    semantic_top_n: int = Field(default=60, description="Max chunks picked per section by similarity")
+    semantic_token_budget: int = Field(default=30000, description="Max tokens of chunks picked per section by similarity")
+    extraction_combined: bool = Field(default=True, description="Extract all sections relevant to a batch in one request, sending each chunk once")
+    entity_merge_enabled: bool = Field(default=True, description="Deduplicate entities extracted from different batches")
+    entity_merge_threshold: float = Field(default=0.93, description="Name similarity (0-1) at which entities are merged")
 
     # Embedding Service (Ollama)
     embedding_base_url: str = Field(default="http://localhost:11434")
     embedding_model_name: str = Field(default="mxbai-embed-large")
     embedding_dimensions: int = Field(default=1024)
+    embedding_batch_size: int = Field(default=32, description="Texts per embedding request")
+    embedding_max_concurrency: int = Field(default=4, description="Max in-flight embedding requests")
+    embedding_max_retries: int = Field(default=2)
+    embedding_timeout: float = Field(default=120.0)
+
+    # Vector index (see scripts/init_db.py)
+    vector_index_type: str = Field(default="hnsw", description="hnsw or ivfflat")
+    vector_index_m: int = Field(default=16)
+    vector_index_ef_construction: int = Field(default=64)
+    vector_index_lists: int = Field(default=100)
 
     # Processing
     chunk_size: int = Field(default=1000)
     chunk_overlap: int = Field(default=350)
+    parser_workers: int = Field(default=1, description="Processes used for PDF page parsing; 1 parses in a single thread")
+    parser_pages_per_task: int = Field(default=25, description="Pages handed to a parser process per task")
+    parser_table_mode: str = Field(default="fast", description="'fast' skips table detection on pages without ruling lines; 'strict' runs it on every page")
+    parse_cache_enabled: bool = Field(default=True, description="Cache parsed documents by PDF content hash")
+    parse_cache_dir: str = Field(default=".cache/parsed")
+    parse_cache_max_bytes: int = Field(default=1024 * 1024 * 1024, description="Least recently used entries are evicted beyond this size; 0 disables the cap")
+    parser_incremental: bool = Field(default=True, description="Reuse cached pages whose content fingerprint is unchanged")
 
     class Config:
         env_file = ".env"
@@ -1,4 +1,4 @@
-from sqlalchemy import (Column, String, Text, Integer, DateTime, ForeignKey, Enum, Numeric, func, Index, create_engine)
+from sqlalchemy import (Column, String, Text, Integer, DateTime, ForeignKey, Enum, Numeric, func, Index, create_engine, text)
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 from pgvector.sqlalchemy import Vector
@@ -11,6 +11,25 @@ class IngestionStatus(str, enum.Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+
+# Allowed status changes. PROCESSING -> PROCESSING covers a job redelivered after a worker crash.
+INGESTION_TRANSITIONS = {
+    IngestionStatus.PENDING: {IngestionStatus.PROCESSING},
+    IngestionStatus.PROCESSING: {IngestionStatus.PROCESSING, IngestionStatus.COMPLETED, IngestionStatus.FAILED},
+    IngestionStatus.FAILED: {IngestionStatus.PROCESSING},
+    IngestionStatus.COMPLETED: set(),
+}
+
+class IngestionStage(str, enum.Enum):
+    """Checkpointed pipeline stages within PROCESSING; extraction sections use extracted(name)."""
+    PARSED = "parsed"
+    CHUNKED = "chunked"
+    EMBEDDED = "embedded"
+
+    @staticmethod
+    def extracted(section: str) -> str:
+        return f"extracted:{section}"
+
 class ChunkType(str, enum.Enum):
     HEADING = "heading"
     PARAGRAPH = "paragraph"
@@ -57,11 +76,18 @@ class ProspectusExtraction(Base):
     total_entities_extracted=Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     ingestion = relationship("ProspectusIngestion", back_populates="extractions")
+    __table_args__ = (
+        # One extraction per ingestion; the repository upserts on it
+        Index("uq_extractions_ingestion_id", "ingestion_id", unique=True),
+    )
 
 class ProspectusChunk(Base):
     __tablename__ = "prospectus_chunks"
     chunk_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     ingestion_id = Column(UUID(as_uuid=True), ForeignKey("prospectus_ingestions.ingestion_id"), nullable=False)
+    # Content-derived TextChunk.chunk_id, shared by identical chunks across revisions;
+    # chunk_id (the row key) is derived from it and the ingestion_id
+    content_id = Column(String(36))
     chunk_type = Column(String(20))
     chunk_text = Column(Text, nullable=False)
     page_number = Column(Integer)
@@ -88,3 +114,47 @@ def get_engine(database_url:str):
 
 def get_session_factory(engine):
     return sessionmaker(bind=engine)
+
+
+def add_missing_columns(engine):
+    """create_all() does not alter existing tables; add columns and constraints introduced after the first release."""
+    with engine.connect() as conn:
+        conn.execute(text("ALTER TABLE prospectus_chunks ADD COLUMN IF NOT EXISTS content_id VARCHAR(36)"))
+        # Keep the newest of any duplicate extractions left by the old update-then-insert upsert
+        conn.execute(text(
+            "DELETE FROM prospectus_extractions a USING prospectus_extractions b "
+            "WHERE a.ingestion_id = b.ingestion_id "
+            "AND (a.created_at, a.extraction_id::text) < (b.created_at, b.extraction_id::text)"
+        ))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_extractions_ingestion_id ON prospectus_extractions (ingestion_id)"
+        ))
+        conn.commit()
+
+
+VECTOR_INDEX_NAME = "idx_vectors_embedding_ann"
+
+
+def create_vector_index(engine, index_type: str = "hnsw", m: int = 16, ef_construction: int = 64,
+                        lists: int = 100, rebuild: bool = False):
+    """
+    Create the ANN index on prospectus_vectors.embedding (cosine distance).
+    index_type is "hnsw" (tuned by m / ef_construction) or "ivfflat" (tuned by lists;
+    build it after vectors are loaded so the list centroids are meaningful).
+    Pass rebuild=True to drop an existing index, e.g. to switch type or parameters.
+    """
+    if index_type == "hnsw":
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    elif index_type == "ivfflat":
+        options = f"lists = {int(lists)}"
+    else:
+        raise ValueError(f"Unsupported vector index type: {index_type}")
+
+    with engine.connect() as conn:
+        if rebuild:
+            conn.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {VECTOR_INDEX_NAME} ON prospectus_vectors "
+            f"USING {index_type} (embedding vector_cosine_ops) WITH ({options})"
+        ))
+        conn.commit()
@@ -60,6 +60,7 @@ class ExtractionMetaData(BaseModel):
     total_pages: int = 0
     confidence_scores: dict[str, float] = Field(default_factory=dict)
     warnings:list[str] = Field(default_factory=list)
+    llm_usage: dict[str, dict] = Field(default_factory=dict)
 
 class UniversityExtraction(BaseModel):
     schema_version: str = "v1.0.0"
@@ -0,0 +1,388 @@
+import io
+import time
+import uuid
+import struct
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg2.extras import Json
+
+from src.config import settings
+from src.models.db import ChunkType, IngestionStatus, INGESTION_TRANSITIONS, get_engine
+from src.models.schema import UniversityExtraction
+from src.services.chunker import TextChunk
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL binary COPY framing
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+_COPY_HEADER = _COPY_SIGNATURE + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_NULL_FIELD = struct.pack(">i", -1)
+
+CHUNK_COLUMNS = ("chunk_id", "ingestion_id", "content_id", "chunk_type", "chunk_text", "page_number", "position_in_doc", "section_label")
+VECTOR_COLUMNS = ("vector_id", "chunk_id", "embedding")
+
+
+def _field(data: Optional[bytes]) -> bytes:
+    if data is None:
+        return _NULL_FIELD
+    return struct.pack(">i", len(data)) + data
+
+
+def _text(value: Optional[str]) -> Optional[bytes]:
+    # PostgreSQL text cannot hold NUL bytes, which occasionally leak out of PDF text layers
+    return value.replace("\x00", "").encode("utf-8") if value is not None else None
+
+
+def _int4(value: Optional[int]) -> Optional[bytes]:
+    return struct.pack(">i", value) if value is not None else None
+
+
+def _vector(row: np.ndarray) -> bytes:
+    """pgvector binary format: int16 dimensions, int16 unused, big-endian float4 values."""
+    return struct.pack(">hh", row.shape[0], 0) + row.astype(">f4").tobytes()
+
+
+def _row_id(ingestion_id: uuid.UUID, chunk_id: str) -> uuid.UUID:
+    """
+    Primary key of a chunk row. Chunk IDs are content-derived and repeat across
+    revisions of a prospectus, so the row key is scoped to the ingestion.
+    """
+    return uuid.uuid5(uuid.UUID(str(ingestion_id)), chunk_id)
+
+
+def _encode_copy(rows: Iterable[Sequence[Optional[bytes]]]) -> io.BytesIO:
+    buffer = io.BytesIO()
+    buffer.write(_COPY_HEADER)
+    for row in rows:
+        buffer.write(struct.pack(">h", len(row)))
+        for value in row:
+            buffer.write(_field(value))
+    buffer.write(_COPY_TRAILER)
+    buffer.seek(0)
+    return buffer
+
+
+@dataclass
+class BulkWriteStats:
+    chunks_written: int = 0
+    vectors_written: int = 0
+    extraction_written: bool = False
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        rows = self.chunks_written + self.vectors_written + int(self.extraction_written)
+        return rows / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class ProspectusRepository:
+    """
+    Write path for an ingestion's chunks, vectors and extraction result.
+
+    Chunks and vectors are streamed with binary COPY; everything for one
+    ingestion is written in a single transaction. Methods are blocking
+    (psycopg2); call them via asyncio.to_thread from async code.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def save_ingestion_results(
+        self,
+        ingestion_id: uuid.UUID,
+        chunks: List[TextChunk],
+        embeddings: Optional[np.ndarray] = None,
+        extraction: Optional[UniversityExtraction] = None,
+    ) -> BulkWriteStats:
+        """
+        Replace the ingestion's stored chunks (and their vectors) and upsert its
+        extraction row. `embeddings` row i must belong to chunks[i].
+        """
+        if embeddings is not None and embeddings.shape[0] != len(chunks):
+            raise ValueError(f"Got {embeddings.shape[0]} embeddings for {len(chunks)} chunks")
+
+        stats = BulkWriteStats()
+        started = time.perf_counter()
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                self._delete_chunks(cur, ingestion_id)
+                stats.chunks_written = self._copy_chunks(cur, ingestion_id, chunks)
+                if embeddings is not None:
+                    stats.vectors_written = self._copy_vectors(cur, ingestion_id, chunks, embeddings)
+                if extraction is not None:
+                    self._upsert_extraction(cur, ingestion_id, extraction)
+                    stats.extraction_written = True
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to persist ingestion {ingestion_id}: {type(e).__name__}: {e}")
+            raise
+        finally:
+            conn.close()
+
+        stats.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            f"Persisted ingestion {ingestion_id}: {stats.chunks_written} chunks, {stats.vectors_written} vectors "
+            f"in {stats.elapsed_seconds:.2f}s ({stats.rows_per_second:.0f} rows/s)"
+        )
+        return stats
+
+    def upsert_extraction(self, ingestion_id: uuid.UUID, extraction: UniversityExtraction) -> None:
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                self._upsert_extraction(cur, ingestion_id, extraction)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _transition(self, ingestion_id: uuid.UUID, target: IngestionStatus, assignments: str = "",
+                    params: tuple = ()) -> Optional[tuple]:
+        """
+        Move an ingestion to `target` if INGESTION_TRANSITIONS allows it from its current
+        status. Returns the updated (status, retry_count) row, or None when the move
+        is not allowed (or the ingestion doesn't exist).
+        """
+        sources = [status.value for status, targets in INGESTION_TRANSITIONS.items() if target in targets]
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"UPDATE prospectus_ingestions SET status = %s, updated_at = now(){assignments} "
+                    "WHERE ingestion_id = %s AND status = ANY(%s) RETURNING status, retry_count",
+                    (target.value,) + params + (str(ingestion_id), sources),
+                )
+                row = cur.fetchone()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return row
+
+    def begin_processing(self, ingestion_id: uuid.UUID) -> bool:
+        """
+        Mark an ingestion as processing. Any start after the first (a retry or a
+        redelivery after a crash) increments retry_count. Returns False when the
+        ingestion is already completed.
+        """
+        row = self._transition(
+            ingestion_id,
+            IngestionStatus.PROCESSING,
+            ", processing_started_at = now(), error_message = NULL, "
+            "retry_count = COALESCE(retry_count, 0) + CASE WHEN status = %s THEN 0 ELSE 1 END",
+            (IngestionStatus.PENDING.value,),
+        )
+        if row is None:
+            logger.warning(f"Ingestion {ingestion_id} is missing or already completed; not processing")
+            return False
+        logger.info(f"Ingestion {ingestion_id} processing (retry_count={row[1]})")
+        return True
+
+    def mark_completed(self, ingestion_id: uuid.UUID) -> None:
+        self._transition(ingestion_id, IngestionStatus.COMPLETED, ", completed_at = now()")
+
+    def mark_failed(self, ingestion_id: uuid.UUID, error_message: str) -> None:
+        self._transition(ingestion_id, IngestionStatus.FAILED, ", error_message = %s", (error_message,))
+
+    def find_previous_ingestion(self, ingestion_id: uuid.UUID) -> Optional[uuid.UUID]:
+        """Most recently completed other ingestion of the same university, i.e. the previous prospectus revision."""
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT prev.ingestion_id FROM prospectus_ingestions cur "
+                    "JOIN prospectus_ingestions prev ON prev.university_id = cur.university_id "
+                    "AND prev.ingestion_id <> cur.ingestion_id "
+                    "WHERE cur.ingestion_id = %s AND prev.status = %s "
+                    "ORDER BY prev.completed_at DESC NULLS LAST LIMIT 1",
+                    (str(ingestion_id), IngestionStatus.COMPLETED.value),
+                )
+                row = cur.fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+        return uuid.UUID(str(row[0])) if row else None
+
+    def load_chunks(self, ingestion_id: uuid.UUID) -> List[TextChunk]:
+        """An ingestion's chunks in document order, with their content-derived IDs."""
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT COALESCE(content_id, chunk_id::text), chunk_type, chunk_text, page_number, "
+                    "position_in_doc, section_label FROM prospectus_chunks "
+                    "WHERE ingestion_id = %s ORDER BY position_in_doc",
+                    (str(ingestion_id),),
+                )
+                rows = cur.fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+        return [
+            TextChunk(
+                chunk_id=chunk_id,
+                text=chunk_text,
+                chunk_type=ChunkType(chunk_type),
+                page_number=page_number,
+                position_in_doc=position_in_doc or 0,
+                section_label=section,
+            )
+            for chunk_id, chunk_type, chunk_text, page_number, position_in_doc, section in rows
+        ]
+
+    def load_extraction(self, ingestion_id: uuid.UUID) -> Optional[UniversityExtraction]:
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT extracted_json FROM prospectus_extractions WHERE ingestion_id = %s "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (str(ingestion_id),),
+                )
+                row = cur.fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+        return UniversityExtraction.model_validate(row[0]) if row else None
+
+    def search_chunks(
+        self,
+        query_embedding: np.ndarray,
+        ingestion_id: uuid.UUID,
+        k: int = 10,
+        section_label: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[Tuple[TextChunk, float]]:
+        """
+        Top-k chunks of an ingestion by cosine distance to `query_embedding`,
+        nearest first. `ef_search` (HNSW) and `probes` (IVFFlat) apply to this
+        query only: raise them for better recall, e.g. when the ingestion or
+        section filter is selective, at the cost of latency.
+        """
+        query_vector = "[" + ",".join(repr(float(x)) for x in np.asarray(query_embedding).ravel()) + "]"
+        filters = "c.ingestion_id = %s"
+        params: list = [query_vector, str(ingestion_id)]
+        if section_label:
+            filters += " AND c.section_label = %s"
+            params.append(section_label.lower())
+        params += [query_vector, k]
+
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                # SET LOCAL scopes the tuning to this transaction
+                if ef_search is not None:
+                    cur.execute("SET LOCAL hnsw.ef_search = %s", (int(ef_search),))
+                if probes is not None:
+                    cur.execute("SET LOCAL ivfflat.probes = %s", (int(probes),))
+                cur.execute(
+                    "SELECT COALESCE(c.content_id, c.chunk_id::text), c.chunk_type, c.chunk_text, c.page_number, c.position_in_doc, "
+                    "c.section_label, v.embedding <=> %s::vector AS distance "
+                    "FROM prospectus_vectors v JOIN prospectus_chunks c ON c.chunk_id = v.chunk_id "
+                    f"WHERE {filters} "
+                    "ORDER BY v.embedding <=> %s::vector LIMIT %s",
+                    params,
+                )
+                rows = cur.fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+
+        return [
+            (
+                TextChunk(
+                    chunk_id=chunk_id,
+                    text=chunk_text,
+                    chunk_type=ChunkType(chunk_type),
+                    page_number=page_number,
+                    position_in_doc=position_in_doc or 0,
+                    section_label=section,
+                ),
+                float(distance),
+            )
+            for chunk_id, chunk_type, chunk_text, page_number, position_in_doc, section, distance in rows
+        ]
+
+    @staticmethod
+    def _delete_chunks(cur, ingestion_id: uuid.UUID) -> None:
+        cur.execute(
+            "DELETE FROM prospectus_vectors WHERE chunk_id IN "
+            "(SELECT chunk_id FROM prospectus_chunks WHERE ingestion_id = %s)",
+            (str(ingestion_id),),
+        )
+        cur.execute("DELETE FROM prospectus_chunks WHERE ingestion_id = %s", (str(ingestion_id),))
+
+    @staticmethod
+    def _copy_chunks(cur, ingestion_id: uuid.UUID, chunks: List[TextChunk]) -> int:
+        ingestion_bytes = uuid.UUID(str(ingestion_id)).bytes
+        rows = (
+            (
+                _row_id(ingestion_id, chunk.chunk_id).bytes,
+                ingestion_bytes,
+                _text(chunk.chunk_id),
+                _text(chunk.chunk_type.value),
+                _text(chunk.text),
+                _int4(chunk.page_number),
+                _int4(chunk.position_in_doc),
+                _text(chunk.section_label),
+            )
+            for chunk in chunks
+        )
+        cur.copy_expert(
+            f"COPY prospectus_chunks ({', '.join(CHUNK_COLUMNS)}) FROM STDIN WITH (FORMAT binary)",
+            _encode_copy(rows),
+        )
+        return len(chunks)
+
+    @staticmethod
+    def _copy_vectors(cur, ingestion_id: uuid.UUID, chunks: List[TextChunk], embeddings: np.ndarray) -> int:
+        rows = (
+            (uuid.uuid4().bytes, _row_id(ingestion_id, chunk.chunk_id).bytes, _vector(embeddings[i]))
+            for i, chunk in enumerate(chunks)
+        )
+        cur.copy_expert(
+            f"COPY prospectus_vectors ({', '.join(VECTOR_COLUMNS)}) FROM STDIN WITH (FORMAT binary)",
+            _encode_copy(rows),
+        )
+        return len(chunks)
+
+    @staticmethod
+    def _upsert_extraction(cur, ingestion_id: uuid.UUID, extraction: UniversityExtraction) -> None:
+        scores = extraction.metadata.confidence_scores
+        confidence = round(sum(scores.values()) / len(scores), 2) if scores else None
+        total_entities = (
+            len(extraction.departments)
+            + sum(len(d.programs) for d in extraction.departments)
+            + len(extraction.facilities)
+            + len(extraction.fee_structure)
+        )
+        # Atomic on uq_extractions_ingestion_id, so concurrent redeliveries of a job cannot both insert
+        cur.execute(
+            "INSERT INTO prospectus_extractions (extraction_id, ingestion_id, schema_version, extracted_json, "
+            "confidence_scores, total_entities_extracted) VALUES (%s, %s, %s, %s, %s, %s) "
+            "ON CONFLICT (ingestion_id) DO UPDATE SET schema_version = EXCLUDED.schema_version, "
+            "extracted_json = EXCLUDED.extracted_json, confidence_scores = EXCLUDED.confidence_scores, "
+            "total_entities_extracted = EXCLUDED.total_entities_extracted",
+            (
+                str(uuid.uuid4()),
+                str(ingestion_id),
+                extraction.schema_version,
+                Json(extraction.model_dump(mode="json")),
+                confidence,
+                total_entities,
+            ),
+        )
+
+
+prospectus_repository = ProspectusRepository(get_engine(settings.database_url))
@@ -0,0 +1,208 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Optional
+
+import httpx
+
+from . import llm_telemetry
+
+logger = logging.getLogger(__name__)
+
+# Status codes that mean the server is overloaded rather than that the request was bad
+OVERLOAD_STATUS = {429, 500, 502, 503, 504}
+
+# Smoothing of the recent latency average
+RECENT_ALPHA = 0.3
+# Per-sample upward drift of the baseline, so it recovers when requests genuinely get slower
+BASELINE_DRIFT = 0.0005
+# Samples before latency may shrink the limit
+WARMUP_SAMPLES = 5
+# Multiplicative decrease on an overload response and on a latency rise
+OVERLOAD_DECREASE = 0.5
+LATENCY_DECREASE = 0.9
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to the server (AIMD).
+
+    The limit grows by about one slot per limit's worth of successful requests
+    while the limiter is saturated and the recent latency stays within
+    `latency_tolerance` of the baseline (the lowest smoothed latency seen). It shrinks multiplicatively on
+    a latency rise and, more sharply, on timeouts, 429s and 5xxs, at most once
+    per round trip so one burst of failures counts as one congestion event.
+    A Retry-After holds back every request until it expires. Waiters are served
+    in arrival order. With min_limit == max_limit it is a plain semaphore.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_tolerance: float = 1.5,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._recent_latency: Optional[float] = None
+        self._baseline_latency: Optional[float] = None
+        self._samples = 0
+        self._cooldown_until = 0.0
+        self._blocked_until = 0.0
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def available(self) -> bool:
+        return self.in_flight < self.limit and not self._waiters
+
+    @property
+    def adaptive(self) -> bool:
+        return self.min_limit < self.max_limit
+
+    async def acquire(self) -> None:
+        if self.available:
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just as we were cancelled
+                    self.release()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        try:
+            delay = self._blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        self._publish()
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+    def _wake(self) -> None:
+        # Hand free slots to waiters in arrival order
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+        self._publish()
+
+    def on_success(self, latency: float) -> None:
+        """Feed back one completed request's latency."""
+        if not self.adaptive:
+            return
+        self._samples += 1
+        if self._recent_latency is None:
+            self._recent_latency = self._baseline_latency = latency
+        else:
+            self._recent_latency += RECENT_ALPHA * (latency - self._recent_latency)
+
+        if self._recent_latency > self._baseline_latency * self.latency_tolerance:
+            if self._samples >= WARMUP_SAMPLES:
+                self._decrease(LATENCY_DECREASE, "latency rising")
+            return
+        # Lowest smoothed latency seen, i.e. latency without queueing at the server. It only
+        # drifts up while latency is in tolerance, so queueing cannot raise it.
+        self._baseline_latency = min(self._baseline_latency * (1 + BASELINE_DRIFT), self._recent_latency)
+        if self.in_flight >= self.limit:
+            # Only a saturated limiter learns anything from a fast response
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._wake()
+
+    def on_overload(self, retry_after: Optional[float] = None) -> None:
+        """Feed back a timeout or an overload response, with its Retry-After if any."""
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            logger.warning(f"{self.name}: server asked to retry after {retry_after:.1f}s")
+        if self.adaptive:
+            self._decrease(OVERLOAD_DECREASE, "server overloaded")
+
+    def _decrease(self, factor: float, reason: str) -> None:
+        now = time.monotonic()
+        if now < self._cooldown_until:
+            return
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        self._cooldown_until = now + (self._recent_latency or 1.0)
+        if self.limit != previous:
+            logger.info(f"{self.name}: concurrency limit {previous} -> {self.limit} ({reason})")
+        self._publish()
+
+    def _publish(self) -> None:
+        llm_telemetry.set_concurrency(self.name, self.limit, self.in_flight)
+
+
+class LimiterFeedbackTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that reports every HTTP attempt to an AdaptiveLimiter: latency
+    on success, overload on timeouts, 429s and 5xxs (honouring Retry-After).
+    It sees the OpenAI SDK's own retries individually, which the caller cannot.
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.limiter = limiter
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            self.limiter.on_overload()
+            raise
+        if response.status_code in OVERLOAD_STATUS:
+            self.limiter.on_overload(parse_retry_after(response.headers.get("retry-after")))
+        elif response.status_code < 400:
+            self.limiter.on_success(time.monotonic() - started)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -1,6 +1,8 @@
+import os
 import logging
 import asyncio
-from typing import Optional, List
+import tempfile
+from typing import IO, AsyncIterator, Dict, Iterable, Optional, List, Union
 from azure.storage.blob.aio import BlobServiceClient, BlobClient, ContainerClient
 from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 from azure.storage.blob import ContentSettings
@@ -9,14 +11,30 @@ from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Blob Batch accepts at most 256 sub-requests per call
+BATCH_MAX_SIZE = 256
+
 class BlobStorageService:
-    def __init__(self):
-        self.connection_string = settings.azure_storage_connection_string
-        self.container_name = settings.azure_storage_container
-        # Explicitly use certifi's CA bundle for SSL verification to fix macOS issues
+    def __init__(self, connection_string: Optional[str] = None, container_name: Optional[str] = None,
+                 max_concurrency: int = settings.blob_download_max_concurrency,
+                 chunk_size: int = settings.blob_download_chunk_size,
+                 upload_max_concurrency: int = settings.blob_upload_max_concurrency,
+                 block_size: int = settings.blob_upload_block_size):
+        # Overrides let tests point at Azurite ("UseDevelopmentStorage=true") or another account
+        self.connection_string = connection_string or settings.azure_storage_connection_string
+        self.container_name = container_name or settings.azure_storage_container
+        self.max_concurrency = max_concurrency
+        self.upload_max_concurrency = upload_max_concurrency
+        # Explicitly use certifi's CA bundle for SSL verification to fix macOS issues.
+        # Blobs larger than one chunk are fetched as ranged GETs of chunk_size bytes, and
+        # uploads larger than one block are staged as block_size blocks then committed.
         self._blob_service_client = BlobServiceClient.from_connection_string(
             self.connection_string,
-            connection_verify=certifi.where()
+            connection_verify=certifi.where(),
+            max_single_get_size=chunk_size,
+            max_chunk_get_size=chunk_size,
+            max_single_put_size=block_size,
+            max_block_size=block_size,
         )
 
     async def close(self):
@@ -40,6 +58,31 @@ class BlobStorageService:
             logger.error(f"Error uploading blob:{blob_name}: {str(e)}")
             raise
 
+    async def upload_file(self, blob_name: str, file: Union[str, IO[bytes]], content_type: str = "application/pdf",
+                          metadata: Optional[dict] = None, max_concurrency: Optional[int] = None) -> str:
+        """
+        Stream a file (path or binary file object) to a blob as parallel block uploads,
+        reading one block at a time instead of loading the whole file.
+        """
+        max_concurrency = max_concurrency or self.upload_max_concurrency
+        try:
+            container_client = await self._get_container_client()
+            blob_client = container_client.get_blob_client(blob_name)
+            content_settings = ContentSettings(content_type=content_type)
+            if isinstance(file, str):
+                with open(file, "rb") as f:
+                    logger.info(f"Uploading blob: {blob_name} from {file} (max_concurrency={max_concurrency})")
+                    await blob_client.upload_blob(f, overwrite=True, content_settings=content_settings,
+                                                  metadata=metadata, max_concurrency=max_concurrency)
+            else:
+                logger.info(f"Uploading blob: {blob_name} from stream (max_concurrency={max_concurrency})")
+                await blob_client.upload_blob(file, overwrite=True, content_settings=content_settings,
+                                              metadata=metadata, max_concurrency=max_concurrency)
+            return blob_client.url
+        except Exception as e:
+            logger.error(f"Error uploading blob:{blob_name}: {str(e)}")
+            raise
+
     async def download(self, blob_name:str) -> bytes:
         try:
             container_client = await self._get_container_client()
@@ -55,6 +98,44 @@ class BlobStorageService:
             logger.error(f"Error downloading blob {blob_name}: {str(e)}")
             raise
 
+    async def download_to_file(self, blob_name: str, path: Optional[str] = None,
+                               max_concurrency: Optional[int] = None) -> str:
+        """
+        Download a blob straight to disk with parallel ranged GETs, without holding
+        the whole file in memory. Writes to `path`, or to a new temp file the caller
+        must delete. Returns the file path.
+        """
+        max_concurrency = max_concurrency or self.max_concurrency
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=os.path.splitext(blob_name)[1], dir=settings.blob_download_dir or None)
+            os.close(fd)
+        try:
+            container_client = await self._get_container_client()
+            blob_client = container_client.get_blob_client(blob_name)
+            logger.info(f"Downloading blob: {blob_name} to {path} (max_concurrency={max_concurrency})")
+            downloader = await blob_client.download_blob(max_concurrency=max_concurrency)
+            with open(path, "wb") as f:
+                size = await downloader.readinto(f)
+            logger.info(f"Downloaded blob: {blob_name} ({size} bytes)")
+            return path
+        except Exception as e:
+            if os.path.exists(path):
+                os.unlink(path)
+            if isinstance(e, ResourceNotFoundError):
+                logger.error(f"Blob Not found: {blob_name}")
+            else:
+                logger.error(f"Error downloading blob {blob_name}: {str(e)}")
+            raise
+
+    async def download_stream(self, blob_name: str, max_concurrency: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield a blob's content in chunk_size pieces, fetching ranges in parallel."""
+        container_client = await self._get_container_client()
+        blob_client = container_client.get_blob_client(blob_name)
+        logger.info(f"Streaming blob: {blob_name}")
+        downloader = await blob_client.download_blob(max_concurrency=max_concurrency or self.max_concurrency)
+        async for chunk in downloader.chunks():
+            yield chunk
+
     async def delete (self, blob_name:str) ->None:
         try:
             container_client = await self._get_container_client()
@@ -72,13 +153,49 @@ class BlobStorageService:
         blob_client = container_client.get_blob_client(blob_name)
         return await blob_client.exists()
 
-    async def list_blobs(self, prefix:Optional[str]=None)-> List[str]:
+    async def delete_many(self, blob_names: Iterable[str]) -> int:
+        """
+        Delete blobs with Blob Batch requests (up to 256 deletes per round trip).
+        Missing blobs are skipped; returns the number actually deleted.
+        """
+        container_client = await self._get_container_client()
+        names = list(blob_names)
+        deleted = 0
+        for start in range(0, len(names), BATCH_MAX_SIZE):
+            batch = names[start:start + BATCH_MAX_SIZE]
+            responses = await container_client.delete_blobs(*batch, raise_on_any_failure=False)
+            async for response in responses:
+                if response.status_code == 202:
+                    deleted += 1
+                elif response.status_code != 404:
+                    logger.error(f"Batch delete failed for a blob: HTTP {response.status_code} {response.reason}")
+        logger.info(f"Deleted {deleted} of {len(names)} blobs")
+        return deleted
+
+    async def exists_many(self, blob_names: Iterable[str],
+                          max_concurrency: int = settings.blob_batch_concurrency) -> Dict[str, bool]:
+        """Check existence of many blobs concurrently (the service has no batch HEAD)."""
         container_client = await self._get_container_client()
-        blob_list =[]
-        # Native async iteration
-        async for blob in container_client.list_blobs(name_starts_with=prefix):
-            blob_list.append(blob.name)
-        return blob_list
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def check(name: str) -> bool:
+            async with semaphore:
+                return await container_client.get_blob_client(name).exists()
+
+        names = list(blob_names)
+        results = await asyncio.gather(*[check(name) for name in names])
+        return dict(zip(names, results))
+
+    async def iter_blobs(self, prefix: Optional[str] = None, page_size: int = 5000) -> AsyncIterator[str]:
+        """Yield blob names page by page, so huge containers are never listed into memory at once."""
+        container_client = await self._get_container_client()
+        pages = container_client.list_blobs(name_starts_with=prefix, results_per_page=page_size).by_page()
+        async for page in pages:
+            async for blob in page:
+                yield blob.name
+
+    async def list_blobs(self, prefix:Optional[str]=None)-> List[str]:
+        return [name async for name in self.iter_blobs(prefix)]
 
 #Singleton instance
 blob_storage = BlobStorageService()
@@ -0,0 +1,129 @@
+import os
+import json
+import shutil
+import logging
+import tempfile
+import threading
+from dataclasses import asdict
+from typing import BinaryIO, Callable, Dict, List, Type, TypeVar
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.config import settings
+from src.models.db import ChunkType, IngestionStage
+from src.services.chunker import TextChunk
+from src.services.document_parser import ParsedDocument, ParsedPage
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class CheckpointStore:
+    """
+    Local per-ingestion checkpoints so a retried ingestion resumes after its last
+    completed stage instead of re-parsing, re-chunking and re-running LLM calls.
+
+    Layout: <root>/<ingestion_id>/{manifest.json, parsed.json, chunks.json,
+    embeddings.npy, section_<name>.json}. Files are written atomically and the
+    manifest is updated last, so a crash mid-write never marks a stage complete.
+    Extraction stages checkpoint concurrently from worker threads: every write
+    goes through its own temp file and manifest updates are serialized.
+    """
+
+    def __init__(self, root: str = settings.checkpoint_dir):
+        self.root = root
+        self._manifest_lock = threading.Lock()
+
+    def _dir(self, ingestion_id: str) -> str:
+        return os.path.join(self.root, str(ingestion_id))
+
+    def _path(self, ingestion_id: str, name: str) -> str:
+        return os.path.join(self._dir(ingestion_id), name)
+
+    def _write_atomic(self, path: str, write: Callable[[BinaryIO], None]) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _write_bytes(self, path: str, data: bytes) -> None:
+        self._write_atomic(path, lambda f: f.write(data))
+
+    def completed_stages(self, ingestion_id: str) -> List[str]:
+        try:
+            with open(self._path(ingestion_id, "manifest.json")) as f:
+                return json.load(f)["completed"]
+        except FileNotFoundError:
+            return []
+
+    def _mark(self, ingestion_id: str, stage: str) -> None:
+        # Read-modify-write; concurrent section checkpoints would otherwise drop each other's entries
+        with self._manifest_lock:
+            completed = self.completed_stages(ingestion_id)
+            if stage not in completed:
+                completed.append(stage)
+            self._write_bytes(self._path(ingestion_id, "manifest.json"), json.dumps({"completed": completed}).encode())
+        logger.info(f"[{ingestion_id}] Checkpointed stage '{stage}'")
+
+    def save_parsed(self, ingestion_id: str, document: ParsedDocument) -> None:
+        payload = {
+            "total_pages": document.total_pages,
+            "metadata": document.metadata,
+            "pages": [asdict(p) for p in document.pages],
+        }
+        self._write_bytes(self._path(ingestion_id, "parsed.json"), json.dumps(payload, default=str).encode())
+        self._mark(ingestion_id, IngestionStage.PARSED.value)
+
+    def load_parsed(self, ingestion_id: str) -> ParsedDocument:
+        with open(self._path(ingestion_id, "parsed.json")) as f:
+            payload = json.load(f)
+        return ParsedDocument(
+            total_pages=payload["total_pages"],
+            pages=[ParsedPage(**p) for p in payload["pages"]],
+            metadata=payload["metadata"],
+        )
+
+    def save_chunks(self, ingestion_id: str, chunks: List[TextChunk]) -> None:
+        payload = [{**asdict(c), "chunk_type": c.chunk_type.value} for c in chunks]
+        self._write_bytes(self._path(ingestion_id, "chunks.json"), json.dumps(payload).encode())
+        self._mark(ingestion_id, IngestionStage.CHUNKED.value)
+
+    def load_chunks(self, ingestion_id: str) -> List[TextChunk]:
+        with open(self._path(ingestion_id, "chunks.json")) as f:
+            payload = json.load(f)
+        return [TextChunk(**{**c, "chunk_type": ChunkType(c["chunk_type"])}) for c in payload]
+
+    def save_embeddings(self, ingestion_id: str, embeddings: np.ndarray) -> None:
+        self._write_atomic(self._path(ingestion_id, "embeddings.npy"), lambda f: np.save(f, embeddings))
+        self._mark(ingestion_id, IngestionStage.EMBEDDED.value)
+
+    def load_embeddings(self, ingestion_id: str) -> np.ndarray:
+        return np.load(self._path(ingestion_id, "embeddings.npy"))
+
+    def save_section(self, ingestion_id: str, name: str, result: BaseModel) -> None:
+        self._write_bytes(self._path(ingestion_id, f"section_{name}.json"), result.model_dump_json().encode())
+        self._mark(ingestion_id, IngestionStage.extracted(name))
+
+    def load_sections(self, ingestion_id: str, models: Dict[str, Type[BaseModel]]) -> Dict[str, BaseModel]:
+        """Load every checkpointed extraction section among `models` (stage name -> response model)."""
+        completed = set(self.completed_stages(ingestion_id))
+        sections = {}
+        for name, model in models.items():
+            if IngestionStage.extracted(name) in completed:
+                with open(self._path(ingestion_id, f"section_{name}.json")) as f:
+                    sections[name] = model.model_validate_json(f.read())
+        return sections
+
+    def clear(self, ingestion_id: str) -> None:
+        shutil.rmtree(self._dir(ingestion_id), ignore_errors=True)
+
+
+checkpoint_store = CheckpointStore()
@@ -0,0 +1,33 @@
+from dataclasses import dataclass, field
+from typing import List, Set
+
+from src.services.chunker import TextChunk
+
+
+@dataclass
+class ChunkDiff:
+    """Chunk ID sets of a prospectus revision relative to the previous ingestion."""
+    added_ids: Set[str] = field(default_factory=set)
+    removed_ids: Set[str] = field(default_factory=set)
+    unchanged_ids: Set[str] = field(default_factory=set)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added_ids or self.removed_ids)
+
+    def summary(self) -> str:
+        return f"{len(self.added_ids)} added, {len(self.removed_ids)} removed, {len(self.unchanged_ids)} unchanged"
+
+
+def diff_chunks(previous: List[TextChunk], current: List[TextChunk]) -> ChunkDiff:
+    """
+    Compare two chunkings by their content-derived IDs (see content_chunk_id).
+    An edited chunk shows up as one removed and one added ID.
+    """
+    previous_ids = {c.chunk_id for c in previous}
+    current_ids = {c.chunk_id for c in current}
+    return ChunkDiff(
+        added_ids=current_ids - previous_ids,
+        removed_ids=previous_ids - current_ids,
+        unchanged_ids=current_ids & previous_ids,
+    )
@@ -1,7 +1,7 @@
 import re
 import uuid
 import logging
-from typing import List, Optional, Tuple
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 
 from src.config import settings
@@ -10,6 +10,40 @@ from src.services.document_parser import ParsedPage, ParsedDocument
 
 logger = logging.getLogger(__name__)
 
+_BLOCK_SPLIT_RE = re.compile(r'\n\s*\n')
+_EXCESS_NEWLINES_RE = re.compile(r'\n{4,}')
+_INLINE_WHITESPACE_RE = re.compile(r'[ \t]+')
+_SENTENCE_END_RE = re.compile(r'[.!?]\s')
+_SENTENCE_BREAK_RE = re.compile(r'[.!?]\s+')
+
+# Namespace for content-derived chunk IDs; changing it changes every chunk ID
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1d9a52-3c0e-5b7a-9e4f-0b8c2d7e1a35")
+
+
+def content_chunk_id(chunk_type: ChunkType, section_label: Optional[str], text: str, occurrence: int = 0) -> str:
+    """
+    Stable chunk ID derived from what the extractor sees: type, section label and
+    text. Page and position are left out so that an unchanged chunk keeps its ID
+    when a revised prospectus shifts pages. `occurrence` tells apart repeated
+    identical chunks (e.g. a table printed twice).
+    """
+    key = f"{chunk_type.value}\x1f{section_label or ''}\x1f{text}\x1f{occurrence}"
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, key))
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Lowercased leading literal word of a regex (e.g. "tuition" for r"Tuition\s+Fee"); "" if none."""
+    depth = 0
+    for char in pattern:
+        depth += char == "("
+        depth -= char == ")"
+        if char == "|" and depth == 0:
+            return ""  # top-level alternation has no single required prefix
+    # Stop before a letter made optional/repeatable by a quantifier
+    match = re.match(r"[A-Za-z]+(?![?*{])", pattern)
+    return match.group(0).lower() if match else ""
+
+
 @dataclass
 class TextChunk:
     chunk_id: str
@@ -21,6 +55,15 @@ class TextChunk:
     metadata: dict = field(default_factory=dict)
 
 
+@dataclass
+class _ChunkingState:
+    """Running context carried from one page to the next while chunking."""
+    current_section: str = "general"
+    current_header: Optional[str] = None
+    position: int = 0
+    occurrences: Dict[str, int] = field(default_factory=dict)
+
+
 class ChunkerService:
     # Regex patterns for section detection (more reliable than keywords)
     SECTION_PATTERNS = {
@@ -96,112 +139,170 @@ class ChunkerService:
         r"^Page\s*\d+\s*(?:of\s*\d+)?\s*$",  # Page numbers
     ]
 
+    # Headers that don't fit the line-anchored HEADER_PATTERNS above
+    HEADER_PREFIX_PATTERNS = [
+        r"^DEPARTMENT\s+OF\s+",
+        r"^B\.?S\.?c?\.\s+",
+    ]
+
     def __init__(self):
         self.chunk_size = settings.chunk_size
         self.chunk_overlap = max(settings.chunk_overlap, 300)  # Minimum 300 for context
 
+        # Compile every pattern once. Section patterns are kept separate (not merged into
+        # one alternation) so each keeps its own non-overlapping findall count; the literal
+        # prefix lets _classify_section skip patterns that cannot match the sample.
+        self._section_matchers = [
+            (section, _literal_prefix(pattern), re.compile(pattern, re.IGNORECASE))
+            for section, patterns in self.SECTION_PATTERNS.items()
+            for pattern in patterns
+        ]
+        self._header_regex = re.compile(
+            "|".join(f"(?:{p})" for p in self.HEADER_PATTERNS + self.HEADER_PREFIX_PATTERNS),
+            re.IGNORECASE,
+        )
+        # Noise patterns stay ordered: removing a running footer can leave a bare page number behind
+        self._noise_regexes = [re.compile(p, re.MULTILINE | re.IGNORECASE) for p in self.NOISE_PATTERNS]
+
     def chunk_document(self, document: ParsedDocument) -> List[TextChunk]:
         """Main chunking pipeline with preprocessing."""
         all_chunks: List[TextChunk] = []
-        current_section = "general"
-        current_header = None
-        position = 0
+        state = _ChunkingState()
 
         for page in document.pages:
-            # Process tables first
-            for table in page.tables:
-                table_text = self._format_table(table)
-                if table_text:
-                    section = self._classify_section(table_text, current_section)
-                    all_chunks.append(self._create_chunk(
-                        text=table_text,
-                        chunk_type=ChunkType.TABLE,
-                        page=page,
-                        section=section,
-                        position=position,
-                        header_context=current_header
-                    ))
-                    position += 1
+            all_chunks.extend(self._chunk_page(page, state))
+
+        logger.info(f"Generated {len(all_chunks)} chunks from {document.total_pages} pages")
+        return all_chunks
+
+    async def chunk_stream(self, pages: AsyncIterable[ParsedPage]) -> AsyncIterator[TextChunk]:
+        """
+        Streaming counterpart of chunk_document: consume pages as they arrive
+        (e.g. from DocumentParserService.parse_pdf_stream) and yield chunks per page,
+        carrying section/header context across page boundaries.
+        """
+        state = _ChunkingState()
+        page_count = 0
+        chunk_count = 0
+
+        async for page in pages:
+            page_count += 1
+            for chunk in self._chunk_page(page, state):
+                chunk_count += 1
+                yield chunk
+
+        logger.info(f"Generated {chunk_count} chunks from {page_count} streamed pages")
+
+    def _chunk_page(self, page: ParsedPage, state: "_ChunkingState") -> List[TextChunk]:
+        """Chunk a single page, reading and updating the running section context in `state`."""
+        page_chunks: List[TextChunk] = []
+        current_section = state.current_section
+        current_header = state.current_header
+        position = state.position
+
+        # Process tables first
+        for table in page.tables:
+            table_text = self._format_table(table)
+            if table_text:
+                section = self._classify_section(table_text, current_section)
+                page_chunks.append(self._create_chunk(
+                    text=table_text,
+                    chunk_type=ChunkType.TABLE,
+                    page=page,
+                    section=section,
+                    position=position,
+                    header_context=current_header
+                ))
+                position += 1
+
+        # Preprocess page text to remove noise
+        cleaned_text = self._preprocess_text(page.text)
+        
+        # Split into blocks
+        raw_blocks = _BLOCK_SPLIT_RE.split(cleaned_text)
+        buffer_text = ""
 
-            # Preprocess page text to remove noise
-            cleaned_text = self._preprocess_text(page.text)
-            
-            # Split into blocks
-            raw_blocks = re.split(r'\n\s*\n', cleaned_text)
-            buffer_text = ""
-
-            for block in raw_blocks:
-                block = block.strip()
-                if not block:
-                    continue
-
-                # Check if this is a major header
-                header_match = self._detect_header(block)
-                if header_match:
-                    # Flush buffer before starting new section
-                    if buffer_text:
-                        section = self._classify_section(buffer_text, current_section)
-                        all_chunks.append(self._create_chunk(
-                            buffer_text, ChunkType.PARAGRAPH, page, section, position, current_header
-                        ))
-                        buffer_text = ""
-                        position += 1
-
-                    current_header = header_match
-                    current_section = self._classify_section(block, "general")
-                    all_chunks.append(self._create_chunk(
-                        block, ChunkType.HEADING, page, current_section, position, current_header
+        for block in raw_blocks:
+            block = block.strip()
+            if not block:
+                continue
+
+            # Check if this is a major header
+            header_match = self._detect_header(block)
+            if header_match:
+                # Flush buffer before starting new section
+                if buffer_text:
+                    section = self._classify_section(buffer_text, current_section)
+                    page_chunks.append(self._create_chunk(
+                        buffer_text, ChunkType.PARAGRAPH, page, section, position, current_header
                     ))
+                    buffer_text = ""
                     position += 1
-                    continue
-
-                # Check if block is a curriculum table (pipe-delimited)
-                if self._is_table_format(block):
-                    section = self._classify_section(block, current_section)
-                    if "credit" in block.lower() or "semester" in block.lower():
-                        section = "curriculum"
-                    all_chunks.append(self._create_chunk(
-                        block, ChunkType.TABLE, page, section, position, current_header
+
+                current_header = header_match
+                current_section = self._classify_section(block, "general")
+                page_chunks.append(self._create_chunk(
+                    block, ChunkType.HEADING, page, current_section, position, current_header
+                ))
+                position += 1
+                continue
+
+            # Check if block is a curriculum table (pipe-delimited)
+            if self._is_table_format(block):
+                section = self._classify_section(block, current_section)
+                if "credit" in block.lower() or "semester" in block.lower():
+                    section = "curriculum"
+                page_chunks.append(self._create_chunk(
+                    block, ChunkType.TABLE, page, section, position, current_header
+                ))
+                position += 1
+                continue
+
+            # Regular text accumulation with size limit
+            if len(buffer_text) + len(block) <= self.chunk_size:
+                buffer_text = f"{buffer_text}\n\n{block}" if buffer_text else block
+            else:
+                if buffer_text:
+                    section = self._classify_section(buffer_text, current_section)
+                    page_chunks.append(self._create_chunk(
+                        buffer_text, ChunkType.PARAGRAPH, page, section, position, current_header
                     ))
                     position += 1
-                    continue
+                    buffer_text = self._get_smart_overlap(buffer_text)
 
-                # Regular text accumulation with size limit
-                if len(buffer_text) + len(block) <= self.chunk_size:
-                    buffer_text = f"{buffer_text}\n\n{block}" if buffer_text else block
+                if len(block) > self.chunk_size:
+                    sub_chunks = self._split_large_text(block, page, current_section, position, current_header)
+                    page_chunks.extend(sub_chunks)
+                    position += len(sub_chunks)
+                    buffer_text = self._get_smart_overlap(block)
                 else:
-                    if buffer_text:
-                        section = self._classify_section(buffer_text, current_section)
-                        all_chunks.append(self._create_chunk(
-                            buffer_text, ChunkType.PARAGRAPH, page, section, position, current_header
-                        ))
-                        position += 1
-                        buffer_text = self._get_smart_overlap(buffer_text)
-
-                    if len(block) > self.chunk_size:
-                        sub_chunks = self._split_large_text(block, page, current_section, position, current_header)
-                        all_chunks.extend(sub_chunks)
-                        position += len(sub_chunks)
-                        buffer_text = self._get_smart_overlap(block)
-                    else:
-                        buffer_text = f"{buffer_text}\n\n{block}" if buffer_text else block
-
-            # Flush page buffer
-            if buffer_text:
-                section = self._classify_section(buffer_text, current_section)
-                all_chunks.append(self._create_chunk(
-                    buffer_text, ChunkType.PARAGRAPH, page, section, position, current_header
-                ))
-                position += 1
+                    buffer_text = f"{buffer_text}\n\n{block}" if buffer_text else block
 
-        logger.info(f"Generated {len(all_chunks)} chunks from {document.total_pages} pages")
-        return all_chunks
+        # Flush page buffer
+        if buffer_text:
+            section = self._classify_section(buffer_text, current_section)
+            page_chunks.append(self._create_chunk(
+                buffer_text, ChunkType.PARAGRAPH, page, section, position, current_header
+            ))
+            position += 1
+
+        # Repeated identical chunks get distinct IDs, numbered in document order
+        for chunk in page_chunks:
+            seen = state.occurrences.get(chunk.chunk_id, 0)
+            state.occurrences[chunk.chunk_id] = seen + 1
+            if seen:
+                chunk.chunk_id = content_chunk_id(chunk.chunk_type, chunk.section_label, chunk.text, seen)
+
+        state.current_section = current_section
+        state.current_header = current_header
+        state.position = position
+        return page_chunks
 
     def _preprocess_text(self, text: str) -> str:
         """Remove PDF noise and normalize text."""
         # Remove noise patterns
-        for pattern in self.NOISE_PATTERNS:
-            text = re.sub(pattern, "", text, flags=re.MULTILINE | re.IGNORECASE)
+        for regex in self._noise_regexes:
+            text = regex.sub("", text)
 
         # Remove duplicate consecutive lines (common PDF artifact)
         lines = text.split('\n')
@@ -219,8 +320,8 @@ class ChunkerService:
         text = '\n'.join(cleaned_lines)
 
         # Collapse excessive whitespace but preserve paragraph breaks
-        text = re.sub(r'\n{4,}', '\n\n\n', text)
-        text = re.sub(r'[ \t]+', ' ', text)
+        text = _EXCESS_NEWLINES_RE.sub('\n\n\n', text)
+        text = _INLINE_WHITESPACE_RE.sub(' ', text)
 
         return text.strip()
 
@@ -246,14 +347,8 @@ class ChunkerService:
         if len(text) > 150:  # Headers aren't that long
             return None
         
-        for pattern in self.HEADER_PATTERNS:
-            if re.match(pattern, text, re.IGNORECASE):
-                return text
-
-        # Also check for structured headers like "DEPARTMENT OF COMPUTER SCIENCE"
-        if re.match(r"^DEPARTMENT\s+OF\s+", text, re.IGNORECASE):
-            return text
-        if re.match(r"^B\.?S\.?c?\.\s+", text, re.IGNORECASE):
+        # One match against HEADER_PATTERNS and HEADER_PREFIX_PATTERNS combined
+        if self._header_regex.match(text):
             return text
 
         return None
@@ -270,16 +365,17 @@ class ChunkerService:
     def _classify_section(self, text: str, current_section: str) -> str:
         """Classify text into a section using pattern matching."""
         text_sample = text[:1500]  # Check first part of text
+        lowered_sample = text_sample.lower()
 
         # Score each section based on pattern matches
         scores = {}
-        for section, patterns in self.SECTION_PATTERNS.items():
-            score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, text_sample, re.IGNORECASE)
-                score += len(matches)
+        for section, prefix, regex in self._section_matchers:
+            # A pattern cannot match unless its leading literal word is present
+            if prefix not in lowered_sample:
+                continue
+            score = len(regex.findall(text_sample))
             if score > 0:
-                scores[section] = score
+                scores[section] = scores.get(section, 0) + score
 
         if scores:
             # Return section with highest score
@@ -310,7 +406,7 @@ class ChunkerService:
         if len(text) <= max_limit:
             return len(text)
         search_area = text[:max_limit]
-        match = list(re.finditer(r'[.!?]\s', search_area))
+        match = list(_SENTENCE_END_RE.finditer(search_area))
         if match:
             return match[-1].end()
         last_newline = search_area.rfind('\n')
@@ -326,7 +422,7 @@ class ChunkerService:
         if len(text) <= self.chunk_overlap:
             return text
         raw_overlap = text[-self.chunk_overlap:]
-        match = re.search(r'[.!?]\s+', raw_overlap)
+        match = _SENTENCE_BREAK_RE.search(raw_overlap)
         if match:
             return raw_overlap[match.end():]
         return raw_overlap
@@ -343,9 +439,10 @@ class ChunkerService:
         if header_context:
             metadata["parent_header"] = header_context
 
+        text = text.strip()
         return TextChunk(
-            chunk_id=str(uuid.uuid4()),
-            text=text.strip(),
+            chunk_id=content_chunk_id(chunk_type, section, text),
+            text=text,
             chunk_type=chunk_type,
             page_number=page.page_number,
             position_in_doc=position,
@@ -1,17 +1,33 @@
 import io
+import os
+import mmap
 import asyncio
+import hashlib
 import logging
+import tempfile
+import multiprocessing
 import pdfplumber
-from dataclasses import dataclass, field
-from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from pdfminer.pdftypes import PDFStream, resolve1
+
+from src.config import settings
+from src.services.parse_cache import ParseCache
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever a change here alters parse output; cached parses of older versions are discarded
+PARSER_VERSION = "1"
+
+TABLE_MODES = ("fast", "strict")
+
 @dataclass
 class ParsedPage:
     page_number: int
     text: str
     tables: List[List[List[str]]] = field(default_factory=list)
+    tables_skipped: bool = False  # table detection skipped by the fast-mode pre-check
 
 @dataclass
 class ParsedDocument:
@@ -25,25 +41,321 @@ class ParsedDocument:
         parts = [f"Page {p.page_number}: {p.text}" for p in self.pages]
         return "\n\n".join(parts)
 
+
+def _may_contain_table(page) -> bool:
+    """
+    Cheap pre-check before extract_tables. pdfplumber's default "lines" strategy
+    builds cells only from ruling edges (lines, rect and curve sides), so a page
+    with fewer than two horizontal and two vertical edges cannot yield a table.
+    Counting edges reuses already-parsed page objects and costs a fraction of
+    table detection.
+    """
+    if not (page.lines or page.rects or page.curves):
+        return False
+    horizontal = vertical = 0
+    for edge in page.edges:
+        if edge["orientation"] == "h":
+            horizontal += 1
+        else:
+            vertical += 1
+        if horizontal >= 2 and vertical >= 2:
+            return True
+    return False
+
+
+def _parse_page(page, page_number: int, table_mode: str = "strict") -> ParsedPage:
+    text = page.extract_text(layout=True) or ""
+    if table_mode == "fast" and not _may_contain_table(page):
+        return ParsedPage(page_number=page_number, text=text, tables_skipped=True)
+    tables = page.extract_tables() or []
+    cleaned_tables = [[[cell or "" for cell in row] for row in table] for table in tables]
+    return ParsedPage(page_number=page_number, text=text, tables=cleaned_tables)
+
+
+def _table_stats(pages: List[ParsedPage], table_mode: str) -> dict:
+    skipped = sum(1 for page in pages if page.tables_skipped)
+    return {
+        "mode": table_mode,
+        "pages_skipped": skipped,
+        "skip_rate": round(skipped / len(pages), 4) if pages else 0.0,
+    }
+
+
+def _document_to_payload(document: ParsedDocument) -> dict:
+    return {
+        "total_pages": document.total_pages,
+        "metadata": document.metadata,
+        "pages": [asdict(page) for page in document.pages],
+    }
+
+
+def _document_from_payload(payload: dict) -> ParsedDocument:
+    return ParsedDocument(
+        total_pages=payload["total_pages"],
+        pages=[ParsedPage(**page) for page in payload["pages"]],
+        metadata=payload["metadata"],
+    )
+
+
+def _page_indices(pages: Optional[Iterable[int]], total_pages: int) -> List[int]:
+    """Map 1-based page numbers (None = all pages) to sorted 0-based indices."""
+    if pages is None:
+        return list(range(total_pages))
+    indices = sorted({number - 1 for number in pages})
+    if indices and (indices[0] < 0 or indices[-1] >= total_pages):
+        raise ValueError(f"Page numbers must be between 1 and {total_pages}")
+    return indices
+
+
+def _page_fingerprint(page) -> str:
+    """
+    Hash of what determines a page's parse output: its size, decoded content
+    streams, form XObjects and font names. Object numbers and compression are
+    ignored, so an unchanged page keeps its fingerprint when the rest of the
+    prospectus is re-issued.
+    """
+    digest = hashlib.sha256(f"{page.width}x{page.height}".encode())
+    page_obj = page.page_obj
+    for stream in page_obj.contents:
+        digest.update(resolve1(stream).get_data())
+    resources = resolve1(page_obj.resources) or {}
+    for name, font in sorted((resolve1(resources.get("Font")) or {}).items()):
+        digest.update(f"{name}={resolve1(font).get('BaseFont')}".encode())
+    for name, xobject in sorted((resolve1(resources.get("XObject")) or {}).items()):
+        xobject = resolve1(xobject)
+        # Images carry no text; only form XObjects are hashed
+        if isinstance(xobject, PDFStream) and getattr(xobject.get("Subtype"), "name", None) == "Form":
+            digest.update(name.encode())
+            digest.update(xobject.get_data())
+    return digest.hexdigest()
+
+
+def _parse_page_list(pdf_path: str, indices: List[int], table_mode: str = "strict") -> List[ParsedPage]:
+    """Process pool worker: parse the given 0-based pages of the PDF stored at pdf_path."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [_parse_page(pdf.pages[i], i + 1, table_mode) for i in indices]
+
+
 class DocumentParserService:
-    async def parse_pdf(self, pdf_bytes: bytes) -> ParsedDocument:
-        """ aync parse PDF using thread pool to avoid blocking the event loop"""
-        logger.info(f"Starting PDF parsing for {len(pdf_bytes)} bytes")
+    def __init__(self, workers: int = settings.parser_workers, pages_per_task: int = settings.parser_pages_per_task,
+                 cache: Optional[ParseCache] = None, table_mode: str = settings.parser_table_mode,
+                 incremental: bool = settings.parser_incremental):
+        if table_mode not in TABLE_MODES:
+            raise ValueError(f"Unknown table mode {table_mode!r}; expected one of {TABLE_MODES}")
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.table_mode = table_mode
+        self.incremental = incremental
+        self.cache = cache
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_workers = 0
+
+    async def parse_pdf(self, pdf_bytes: bytes, workers: Optional[int] = None, pages: Optional[Iterable[int]] = None,
+                        incremental: Optional[bool] = None) -> ParsedDocument:
+        """
+        Async parse PDF using thread pool to avoid blocking the event loop.
+        `pages` restricts parsing to those 1-based page numbers (e.g. range(40, 46));
+        the result keeps the document's total_pages. With `incremental`, pages whose
+        content fingerprint is already cached are reused instead of re-parsed.
+        """
+        workers = workers or self.workers
+        incremental = self._use_incremental(incremental)
+
+        async def parse() -> ParsedDocument:
+            logger.info(f"Starting PDF parsing for {len(pdf_bytes)} bytes (workers={workers})")
+            if workers > 1:
+                return await self._parse_parallel(pdf_bytes, workers, pages, incremental)
+            return await asyncio.to_thread(self._parse_sync, pdf_bytes, pages, incremental)
+
+        # Partial parses bypass the whole-document cache (the page cache still applies)
+        digest = await asyncio.to_thread(ParseCache.hash_bytes, pdf_bytes) if self.cache and pages is None else None
         try:
-            return await asyncio.to_thread(self._parse_sync, pdf_bytes)
+            return await self._parse_cached(digest, parse)
         except Exception as e:
             logger.error(f"Error parsing PDF: {str(e)}")
             raise
-    def _parse_sync(self, pdf_bytes:bytes) ->ParsedDocument:
-        pages=[]
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+
+    async def parse_pdf_file(self, pdf_path: str, workers: Optional[int] = None, pages: Optional[Iterable[int]] = None,
+                             incremental: Optional[bool] = None) -> ParsedDocument:
+        """
+        Parse a PDF on disk (e.g. from BlobStorageService.download_to_file). The file
+        is memory-mapped rather than read into memory, and the parallel path hands
+        the path to the pool directly instead of copying it to a temp file.
+        `pages` and `incremental` behave as in parse_pdf.
+        """
+        workers = workers or self.workers
+        incremental = self._use_incremental(incremental)
+
+        async def parse() -> ParsedDocument:
+            logger.info(f"Starting PDF parsing for {pdf_path} ({os.path.getsize(pdf_path)} bytes, workers={workers})")
+            if workers > 1:
+                return await self._parse_ranges(pdf_path, workers, pages, incremental)
+            return await asyncio.to_thread(self._parse_file_sync, pdf_path, pages, incremental)
+
+        digest = await asyncio.to_thread(ParseCache.hash_file, pdf_path) if self.cache and pages is None else None
+        try:
+            return await self._parse_cached(digest, parse)
+        except Exception as e:
+            logger.error(f"Error parsing PDF: {str(e)}")
+            raise
+
+    def _use_incremental(self, incremental: Optional[bool]) -> bool:
+        if incremental is None:
+            incremental = self.incremental
+        return incremental and self.cache is not None
+
+    async def _parse_cached(self, digest: Optional[str], parse: Callable[[], Awaitable[ParsedDocument]]) -> ParsedDocument:
+        """Return the cached parse for this content hash, or run `parse` and cache its result."""
+        if self.cache is None or digest is None:
+            return await parse()
+
+        # Table mode changes parse output, so it is part of the key
+        key = f"{digest}-{self.table_mode}"
+        payload = await asyncio.to_thread(self.cache.get, key)
+        if payload is not None:
+            logger.info(f"Parse cache hit for {digest[:12]} (parser v{PARSER_VERSION})")
+            return _document_from_payload(payload)
+
+        document = await parse()
+        try:
+            await asyncio.to_thread(self.cache.put, key, _document_to_payload(document))
+        except Exception as e:
+            # A cache write failure must never fail the parse itself
+            logger.warning(f"Could not write parse cache entry: {type(e).__name__}: {e}")
+        return document
+
+    def _page_key(self, fingerprint: str) -> str:
+        return f"page-{fingerprint}-{self.table_mode}"
+
+    def _load_page(self, key: str, index: int) -> Optional[ParsedPage]:
+        payload = self.cache.get(key)
+        if payload is None:
+            return None
+        return ParsedPage(**{**payload, "page_number": index + 1})
+
+    def _store_pages(self, keys: Dict[int, str], parsed: Iterable[ParsedPage]) -> None:
+        try:
+            for page in parsed:
+                self.cache.put(keys[page.page_number - 1], asdict(page))
+        except Exception as e:
+            logger.warning(f"Could not write page cache entries: {type(e).__name__}: {e}")
+
+    def _finish(self, metadata: dict, total_pages: int, pages: List[ParsedPage], reused: Optional[int]) -> ParsedDocument:
+        metadata = {**metadata, "table_extraction": _table_stats(pages, self.table_mode)}
+        if reused is not None:
+            metadata["incremental"] = {"pages_reused": reused, "pages_parsed": len(pages) - reused}
+            logger.info(f"Incremental parse reused {reused} of {len(pages)} pages")
+        return ParsedDocument(total_pages=total_pages, pages=pages, metadata=metadata)
+
+    async def parse_pdf_stream(self, pdf_bytes: bytes) -> AsyncIterator[ParsedPage]:
+        """
+        Yield pages one at a time as they are parsed instead of building a whole
+        ParsedDocument, so peak memory stays at roughly one page and consumers
+        (ChunkerService.chunk_stream) can start before parsing finishes.
+        """
+        logger.info(f"Starting streaming PDF parse for {len(pdf_bytes)} bytes")
+        pdf = await asyncio.to_thread(pdfplumber.open, io.BytesIO(pdf_bytes))
+        try:
+            for i, page in enumerate(pdf.pages):
+                parsed = await asyncio.to_thread(_parse_page, page, i + 1, self.table_mode)
+                # Release pdfplumber's cached layout objects for this page
+                page.close()
+                yield parsed
+        finally:
+            pdf.close()
+
+    def _parse_sync(self, pdf_bytes:bytes, pages: Optional[Iterable[int]] = None, incremental: bool = False) ->ParsedDocument:
+        return self._parse_source(io.BytesIO(pdf_bytes), pages, incremental)
+
+    def _parse_file_sync(self, pdf_path: str, pages: Optional[Iterable[int]] = None, incremental: bool = False) -> ParsedDocument:
+        with open(pdf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return self._parse_source(mapped, pages, incremental)
+
+    def _parse_source(self, source, pages: Optional[Iterable[int]] = None, incremental: bool = False) -> ParsedDocument:
+        parsed = []
+        reused = 0
+        with pdfplumber.open(source) as pdf:
             metadata = pdf.metadata or {}
             total_pages = len(pdf.pages)
 
-            for i, page in enumerate(pdf.pages):
-                text = page.extract_text(layout=True) or ""
-                tables = page.extract_tables() or []
-                cleaned_tables = [[[cell or "" for cell in row] for row in table] for table in tables]
-                pages.append(ParsedPage(page_number = i + 1, text=text, tables=cleaned_tables))
-        return ParsedDocument(total_pages=total_pages, pages=pages, metadata=metadata)
-document_parser_service = DocumentParserService()
\ No newline at end of file
+            for i in _page_indices(pages, total_pages):
+                page = pdf.pages[i]
+                if not incremental:
+                    parsed.append(_parse_page(page, i + 1, self.table_mode))
+                    continue
+                key = self._page_key(_page_fingerprint(page))
+                cached = self._load_page(key, i)
+                if cached is not None:
+                    parsed.append(cached)
+                    reused += 1
+                    continue
+                result = _parse_page(page, i + 1, self.table_mode)
+                self._store_pages({i: key}, [result])
+                parsed.append(result)
+        return self._finish(metadata, total_pages, parsed, reused if incremental else None)
+
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        if self._pool is None or self._pool_workers != workers:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            # spawn avoids forking a process that already runs event-loop and to_thread threads
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            self._pool_workers = workers
+        return self._pool
+
+    def _read_header(self, pdf_path: str, pages: Optional[Iterable[int]], incremental: bool) -> Tuple[dict, int, List[int], Dict[int, str]]:
+        """Metadata, page count, the 0-based pages to parse and, when incremental, their page-cache keys."""
+        with pdfplumber.open(pdf_path) as pdf:
+            total_pages = len(pdf.pages)
+            indices = _page_indices(pages, total_pages)
+            keys = {i: self._page_key(_page_fingerprint(pdf.pages[i])) for i in indices} if incremental else {}
+            return pdf.metadata or {}, total_pages, indices, keys
+
+    async def _parse_parallel(self, pdf_bytes: bytes, workers: int, pages: Optional[Iterable[int]] = None,
+                              incremental: bool = False) -> ParsedDocument:
+        """Split the page range across a process pool; workers open the PDF from a shared temp file."""
+        tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        try:
+            with tmp:
+                tmp.write(pdf_bytes)
+            return await self._parse_ranges(tmp.name, workers, pages, incremental)
+        finally:
+            os.unlink(tmp.name)
+
+    async def _parse_ranges(self, pdf_path: str, workers: int, pages: Optional[Iterable[int]] = None,
+                            incremental: bool = False) -> ParsedDocument:
+        metadata, total_pages, indices, keys = await asyncio.to_thread(self._read_header, pdf_path, pages, incremental)
+
+        parsed: Dict[int, ParsedPage] = {}
+        if incremental:
+            for i in indices:
+                cached = await asyncio.to_thread(self._load_page, keys[i], i)
+                if cached is not None:
+                    parsed[i] = cached
+        reused = len(parsed)
+        missing = [i for i in indices if i not in parsed]
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool(workers)
+        tasks = [missing[start:start + self.pages_per_task] for start in range(0, len(missing), self.pages_per_task)]
+        logger.info(f"Parsing {len(missing)} pages in {len(tasks)} tasks across {workers} processes")
+        results = await asyncio.gather(*[
+            loop.run_in_executor(pool, _parse_page_list, pdf_path, task, self.table_mode)
+            for task in tasks
+        ])
+        fresh = [page for result in results for page in result]
+        if incremental:
+            await asyncio.to_thread(self._store_pages, keys, fresh)
+
+        for page in fresh:
+            parsed[page.page_number - 1] = page
+        return self._finish(metadata, total_pages, [parsed[i] for i in indices], reused if incremental else None)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+document_parser_service = DocumentParserService(
+    cache=ParseCache(settings.parse_cache_dir, PARSER_VERSION, settings.parse_cache_max_bytes) if settings.parse_cache_enabled else None
+)
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+import httpx
+import numpy as np
+
+from src.config import settings
+from src.services.chunker import TextChunk
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    """
+    Batched embedding client for the Ollama /api/embed endpoint.
+
+    Texts are sent in batches of `embedding_batch_size` with at most
+    `embedding_max_concurrency` requests in flight. Returned vectors are
+    L2-normalised float32 rows aligned with the input order.
+    """
+
+    def __init__(self):
+        self.base_url = settings.embedding_base_url.rstrip("/")
+        self.model_name = settings.embedding_model_name
+        self.dimensions = settings.embedding_dimensions
+        self.batch_size = settings.embedding_batch_size
+        self.max_retries = settings.embedding_max_retries
+        self.semaphore = asyncio.Semaphore(settings.embedding_max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=settings.embedding_timeout)
+        return self._client
+
+    async def close(self):
+        """Close the HTTP client explicitly"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    response = await client.post(
+                        "/api/embed",
+                        json={"model": self.model_name, "input": texts},
+                    )
+                response.raise_for_status()
+                break
+            except httpx.HTTPError as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Embedding batch of {len(texts)} failed: {type(e).__name__}: {e}")
+                    raise
+                logger.warning(f"Embedding batch failed (attempt {attempt + 1}), retrying: {e}")
+                await asyncio.sleep(2 ** attempt)
+
+        vectors = np.asarray(response.json()["embeddings"], dtype=np.float32)
+        if vectors.shape != (len(texts), self.dimensions):
+            raise ValueError(
+                f"Expected embeddings of shape ({len(texts)}, {self.dimensions}), got {vectors.shape}"
+            )
+        return vectors
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an (n, dimensions) float32 matrix of unit vectors."""
+        if not texts:
+            return np.empty((0, self.dimensions), dtype=np.float32)
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches (batch_size={self.batch_size})")
+        # gather() preserves batch order, so rows stay aligned with `texts`
+        results = await asyncio.gather(*[self._embed_batch(batch) for batch in batches])
+        return self._normalize(np.vstack(results))
+
+    async def embed_chunks(self, chunks: List[TextChunk]) -> np.ndarray:
+        """Row i is the normalised embedding of chunks[i], ready for bulk insert."""
+        return await self.embed_texts([c.text for c in chunks])
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query string into a 1-D unit vector."""
+        return (await self.embed_texts([text]))[0]
+
+
+embedding_service = EmbeddingService()
@@ -0,0 +1,176 @@
+import re
+import logging
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TypeVar
+
+from pydantic import BaseModel
+
+from src.config import settings
+from src.models.schema import Department, Facility, FeeItem, Program
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d+")
+
+# Words that vary between mentions of the same entity ("Dept. of CS" / "Department of Computer Science")
+GENERIC_TOKENS = {"the", "of", "and", "department", "dept", "deptt"}
+
+# Blocks larger than this are only deduplicated by exact key; fuzzy matching them would go quadratic
+MAX_FUZZY_BLOCK = 200
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, strip accents and punctuation, '&' -> 'and', collapse whitespace."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    text = text.lower().replace("&", " and ")
+    return _NON_ALNUM_RE.sub(" ", text).strip()
+
+
+def name_key(name: Optional[str]) -> str:
+    """Order-insensitive key of a name's significant words."""
+    tokens = normalize_text(name).split()
+    significant = sorted(t for t in tokens if t not in GENERIC_TOKENS)
+    return " ".join(significant or tokens)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            # Keep the earliest item as the cluster root so merged output stays in document order
+            self.parent[max(a, b)] = min(a, b)
+
+
+def _similar(a: str, b: str, threshold: float) -> bool:
+    # "Computer Lab 10" / "Computer Lab 11" are distinct entities, however similar the text
+    if _NUMBER_RE.findall(a) != _NUMBER_RE.findall(b):
+        return False
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+def cluster(
+    keys: Sequence[str],
+    block_keys: Callable[[str], Iterable[str]],
+    threshold: float,
+    similarity_text: Callable[[str], str] = lambda key: key,
+) -> List[List[int]]:
+    """
+    Group item indices whose keys are equal or fuzzy-similar. Equal keys are joined
+    through a hash index; fuzzy comparisons only run between distinct keys that
+    share a block, which keeps the work near-linear in the number of items.
+    `similarity_text` picks the part of a key that is fuzzy-compared.
+    Clusters are returned in order of first appearance.
+    """
+    uf = _UnionFind(len(keys))
+    first_by_key: Dict[str, int] = {}
+    for i, key in enumerate(keys):
+        if key in first_by_key:
+            uf.union(first_by_key[key], i)
+        else:
+            first_by_key[key] = i
+
+    blocks: Dict[str, List[str]] = {}
+    for key in first_by_key:
+        if not key:
+            continue
+        for block in set(block_keys(key)):
+            blocks.setdefault(block, []).append(key)
+    for members in blocks.values():
+        if len(members) > MAX_FUZZY_BLOCK:
+            continue
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                a, b = members[x], members[y]
+                if uf.find(first_by_key[a]) != uf.find(first_by_key[b]) and _similar(similarity_text(a), similarity_text(b), threshold):
+                    uf.union(first_by_key[a], first_by_key[b])
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(keys)):
+        clusters.setdefault(uf.find(i), []).append(i)
+    return [clusters[root] for root in sorted(clusters)]
+
+
+def _name_blocks(key: str) -> List[str]:
+    """A near-duplicate almost always shares its key's prefix or its longest word."""
+    return [f"p:{key[:4]}", f"w:{max(key.split(), key=len)}"]
+
+
+def _merge_group(group: List[M]) -> M:
+    """Merge a cluster into its first item: fill missing fields, keep the longer description, union lists."""
+    merged = group[0].model_copy(deep=True)
+    for other in group[1:]:
+        for field_name in type(merged).model_fields:
+            mine, theirs = getattr(merged, field_name), getattr(other, field_name)
+            if isinstance(mine, list):
+                if field_name == "programs":
+                    mine.extend(theirs)
+                else:
+                    mine.extend(item for item in theirs if item not in mine)
+            elif mine is None or mine == "":
+                setattr(merged, field_name, theirs)
+            elif field_name == "description" and theirs and len(theirs) > len(mine):
+                setattr(merged, field_name, theirs)
+    return merged
+
+
+class EntityMerger:
+    """
+    Deduplicates entities extracted from different batches: names are normalised
+    to order-insensitive keys, near-duplicates are clustered (hash index plus
+    blocked fuzzy matching), and each cluster is merged into one entity with the
+    union of its fields and source_chunk_ids.
+    """
+
+    def __init__(self, threshold: float = settings.entity_merge_threshold):
+        self.threshold = threshold
+
+    def _merge(self, items: List[M], keys: List[str], block_keys: Callable[[str], Iterable[str]],
+               similarity_text: Callable[[str], str] = lambda key: key) -> List[M]:
+        groups = cluster(keys, block_keys, self.threshold, similarity_text)
+        return [_merge_group([items[i] for i in group]) for group in groups]
+
+    def merge_programs(self, programs: List[Program]) -> List[Program]:
+        return self._merge(programs, [name_key(p.name) for p in programs], _name_blocks)
+
+    def merge_departments(self, departments: List[Department]) -> List[Department]:
+        merged = self._merge(departments, [name_key(d.name) for d in departments], _name_blocks)
+        for department in merged:
+            department.programs = self.merge_programs(department.programs)
+        return merged
+
+    def merge_facilities(self, facilities: List[Facility]) -> List[Facility]:
+        return self._merge(facilities, [name_key(f.name) for f in facilities], _name_blocks)
+
+    def merge_fees(self, fees: List[FeeItem]) -> List[FeeItem]:
+        # Fees only match with equal type, amount and frequency; the program name may differ slightly
+        def fee_key(fee: FeeItem) -> str:
+            return "|".join([
+                normalize_text(fee.fee_type), str(fee.amount), normalize_text(fee.frequency), name_key(fee.program_name),
+            ])
+
+        def fee_blocks(key: str) -> List[str]:
+            return [key.rsplit("|", 1)[0]]
+
+        def program_part(key: str) -> str:
+            return key.rsplit("|", 1)[1]
+
+        return self._merge(fees, [fee_key(f) for f in fees], fee_blocks, program_part)
+
+
+entity_merger = EntityMerger()
@@ -0,0 +1,58 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+from src.services.chunker import TextChunk
+from src.services.token_counter import pack_by_tokens
+
+# Tokens between chunks in a request, matching pack_by_tokens
+SEPARATOR_TOKENS = 2
+
+
+@dataclass
+class ExtractionCall:
+    """One LLM request: a batch of chunks and every section extracted from it."""
+    sections: Tuple[str, ...]
+    chunks: List[TextChunk] = field(default_factory=list)
+    tokens: int = 0
+
+
+def plan_calls(
+    chunks: List[TextChunk],
+    selections: Dict[str, List[TextChunk]],
+    budget_for: Callable[[Tuple[str, ...]], int],
+    count: Callable[[str], int],
+) -> List[ExtractionCall]:
+    """
+    Assign chunks to combined extraction calls so that every chunk is sent once,
+    to exactly the sections that selected it.
+
+    Chunks are grouped by the set of sections that selected them (their
+    signature) and each group is packed, in document order, into requests within
+    `budget_for(signature)` tokens. Groups are never mixed: a chunk in a call for
+    a section that rejected it would be extracted for that section too, so the
+    results would differ from per-section extraction. Calls are returned in
+    document order.
+    """
+    section_order = list(selections)
+    position = {c.chunk_id: i for i, c in enumerate(chunks)}
+    selected_by: Dict[str, set] = {}
+    for name, selected in selections.items():
+        for chunk in selected:
+            selected_by.setdefault(chunk.chunk_id, set()).add(name)
+
+    groups: Dict[Tuple[str, ...], List[TextChunk]] = {}
+    for chunk in chunks:
+        if chunk.chunk_id in selected_by:
+            signature = tuple(name for name in section_order if name in selected_by[chunk.chunk_id])
+            groups.setdefault(signature, []).append(chunk)
+
+    calls: List[ExtractionCall] = []
+    for sections, members in groups.items():
+        for indices in pack_by_tokens([c.text for c in members], budget_for(sections), count, SEPARATOR_TOKENS):
+            calls.append(ExtractionCall(
+                sections=sections,
+                chunks=[members[i] for i in indices],
+                tokens=sum(count(members[i].text) + SEPARATOR_TOKENS for i in indices),
+            ))
+    calls.sort(key=lambda c: position[c.chunks[0].chunk_id])
+    return calls
@@ -0,0 +1,133 @@
+import json
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from azure.servicebus.aio import ServiceBusClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExtractionJob:
+    """Body of a prospectus-extraction-jobs message."""
+    ingestion_id: str
+    blob_name: str
+
+    @classmethod
+    def from_json(cls, body: str) -> "ExtractionJob":
+        data = json.loads(body)
+        return cls(ingestion_id=str(data["ingestion_id"]), blob_name=data["blob_name"])
+
+
+@dataclass
+class ReceivedJob:
+    job: ExtractionJob
+    delivery_count: int = 1
+    message: Any = None  # transport-specific handle used for settlement
+
+
+class JobQueue:
+    """Interface the worker needs from a job transport."""
+
+    async def receive(self, max_messages: int, max_wait_time: float) -> List[ReceivedJob]:
+        raise NotImplementedError
+
+    async def complete(self, received: ReceivedJob) -> None:
+        raise NotImplementedError
+
+    async def abandon(self, received: ReceivedJob) -> None:
+        raise NotImplementedError
+
+    async def dead_letter(self, received: ReceivedJob, reason: str) -> None:
+        raise NotImplementedError
+
+    async def renew_lock(self, received: ReceivedJob) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class ServiceBusJobQueue(JobQueue):
+    """Azure Service Bus queue receiver (peek-lock) with prefetch."""
+
+    def __init__(self, connection_string: str, queue_name: str, prefetch_count: int = 0):
+        self._client = ServiceBusClient.from_connection_string(connection_string)
+        self._receiver = self._client.get_queue_receiver(queue_name, prefetch_count=prefetch_count)
+        self.queue_name = queue_name
+
+    async def receive(self, max_messages: int, max_wait_time: float) -> List[ReceivedJob]:
+        messages = await self._receiver.receive_messages(max_message_count=max_messages, max_wait_time=max_wait_time)
+        received = []
+        for message in messages:
+            try:
+                job = ExtractionJob.from_json(b"".join(message.body).decode("utf-8"))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Dead-lettering malformed message {message.message_id}: {e}")
+                await self._receiver.dead_letter_message(message, reason="MalformedJob", error_description=str(e))
+                continue
+            received.append(ReceivedJob(job=job, delivery_count=message.delivery_count or 1, message=message))
+        return received
+
+    async def complete(self, received: ReceivedJob) -> None:
+        await self._receiver.complete_message(received.message)
+
+    async def abandon(self, received: ReceivedJob) -> None:
+        await self._receiver.abandon_message(received.message)
+
+    async def dead_letter(self, received: ReceivedJob, reason: str) -> None:
+        await self._receiver.dead_letter_message(received.message, reason="ProcessingFailed", error_description=reason[:1024])
+
+    async def renew_lock(self, received: ReceivedJob) -> None:
+        await self._receiver.renew_message_lock(received.message)
+
+    async def close(self) -> None:
+        await self._receiver.close()
+        await self._client.close()
+
+
+@dataclass
+class InMemoryJobQueue(JobQueue):
+    """In-process fake for running the worker without Service Bus; records every settlement."""
+    completed: List[ExtractionJob] = field(default_factory=list)
+    dead_lettered: List[ExtractionJob] = field(default_factory=list)
+    abandoned: List[ExtractionJob] = field(default_factory=list)
+    lock_renewals: int = 0
+    _pending: Optional[asyncio.Queue] = None
+
+    def _queue(self) -> asyncio.Queue:
+        if self._pending is None:
+            self._pending = asyncio.Queue()
+        return self._pending
+
+    def send(self, job: ExtractionJob, delivery_count: int = 1) -> None:
+        self._queue().put_nowait(ReceivedJob(job=job, delivery_count=delivery_count))
+
+    async def receive(self, max_messages: int, max_wait_time: float) -> List[ReceivedJob]:
+        queue = self._queue()
+        try:
+            first = await asyncio.wait_for(queue.get(), timeout=max_wait_time)
+        except asyncio.TimeoutError:
+            return []
+        received = [first]
+        while len(received) < max_messages and not queue.empty():
+            received.append(queue.get_nowait())
+        return received
+
+    async def complete(self, received: ReceivedJob) -> None:
+        self.completed.append(received.job)
+
+    async def abandon(self, received: ReceivedJob) -> None:
+        self.abandoned.append(received.job)
+        self.send(received.job, delivery_count=received.delivery_count + 1)
+
+    async def dead_letter(self, received: ReceivedJob, reason: str) -> None:
+        self.dead_lettered.append(received.job)
+
+    async def renew_lock(self, received: ReceivedJob) -> None:
+        self.lock_renewals += 1
+
+    def empty(self) -> bool:
+        return self._queue().empty()
@@ -1,9 +1,12 @@
+import json
 import logging
-import instructor
 import asyncio
-from openai import AsyncOpenAI
-from typing import List, Optional, Type, TypeVar
-from pydantic import BaseModel
+import time
+from functools import lru_cache, partial
+import numpy as np
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type, TypeVar
+from pydantic import BaseModel, ValidationError, create_model
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt
 from datetime import datetime
 
 from ..config import settings
@@ -12,11 +15,23 @@ from ..models.schema import (
     AdmissionInfo, ExtractionMetaData, Program
 )
 from .chunker import TextChunk
+from .chunk_diff import ChunkDiff
+from .entity_merger import entity_merger
+from .extraction_planner import ExtractionCall, plan_calls
+from .llm_cache import LLMResponseCache
+from .llm_router import LLMBackend, LLMRouter
+from . import llm_telemetry
+from .llm_telemetry import LLMCallRecord, LLMUsageCollector
+from .embedding import embedding_service
+from .token_counter import token_counter, pack_by_tokens
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=BaseModel)
 
+# Attempts per structured completion; instructor re-asks after a response fails validation
+LLM_MAX_ATTEMPTS = 3
+
 
 class DepartmentList(BaseModel):
     items: List[Department] = []
@@ -128,18 +143,162 @@ Return all admission information found.""",
 }
 
 
+# Section stages: response model, primary tags, fallback tags
+SECTION_STAGES = {
+    "departments": (DepartmentList, ["departments"], ["programs", "curriculum", "general"]),
+    "facilities": (FacilityList, ["facilities"], ["departments", "general"]),
+    "fees": (FeeList, ["fees"], ["admissions", "general"]),
+    "admissions": (AdmissionInfo, ["admissions"], ["requirements", "general"]),
+}
+
+# Response model of every extract_all stage, e.g. for loading checkpointed results
+STAGE_MODELS = {
+    "university_info": UniversityInfo,
+    **{name: spec[0] for name, spec in SECTION_STAGES.items()},
+}
+
+# UniversityExtraction field holding each section's result
+SECTION_FIELDS = {
+    "departments": "departments",
+    "facilities": "facilities",
+    "fees": "fee_structure",
+    "admissions": "admissions",
+}
+
+# Queries used to rank chunks by embedding similarity when section labels don't match
+SECTION_QUERIES = {
+    "departments": "Academic departments, faculties and schools with the degree programs they offer",
+    "facilities": "Campus facilities such as laboratories, libraries, hostels, sports and research centers",
+    "fees": "Tuition fees, admission charges, hostel dues and other fee amounts per semester or year",
+    "admissions": "Admission eligibility criteria, entry tests, application process, required documents and deadlines",
+}
+
+# Stages run concurrently; this order only decides whose requests queue first.
+# Cheap, single-call stages go ahead of the large list sections.
+DEFAULT_STAGE_PRIORITY = ["university_info", "admissions", "fees", "facilities", "departments"]
+
+
+EXTRACTION_SYSTEM_PROMPT = "You are a precise data extraction assistant specialized in university prospectuses. Extract ALL relevant data strictly based on the provided text. Return valid JSON with complete information. Do not skip or summarize - extract everything you find."
+
+
+@lru_cache(maxsize=None)
+def _call_spec(sections: Tuple[str, ...]) -> Tuple[Type[BaseModel], str]:
+    """
+    Response model and prompt for a call covering `sections`. A single section uses
+    its own stage model and prompt; several get a composite model with one field
+    per section (the section's item list, or AdmissionInfo) and their prompts combined.
+    """
+    if len(sections) == 1:
+        return SECTION_STAGES[sections[0]][0], PROMPTS[sections[0]]
+    fields = {}
+    for name in sections:
+        response_model = SECTION_STAGES[name][0]
+        if response_model is AdmissionInfo:
+            fields[name] = (Optional[AdmissionInfo], None)
+        else:
+            fields[name] = (response_model.model_fields["items"].annotation, [])
+    model = create_model("Combined" + "".join(name.title() for name in sections), **fields)
+    prompt = (
+        f"Extract several kinds of information from this prospectus text in one pass. "
+        f"Return one JSON object with the keys {', '.join(sections)}; leave a key empty "
+        f"when the text has nothing for it.\n\n"
+        + "\n\n".join(f"### {name}\n{PROMPTS[name]}" for name in sections)
+    )
+    return model, prompt
+
+
+def _split_combined(result: BaseModel, sections: Tuple[str, ...]) -> Dict[str, Optional[BaseModel]]:
+    """A combined call's result as per-section results in each stage's response model."""
+    if len(sections) == 1:
+        return {sections[0]: result}
+    split = {}
+    for name in sections:
+        response_model, value = SECTION_STAGES[name][0], getattr(result, name)
+        split[name] = value if response_model is AdmissionInfo else response_model(items=value)
+    return split
+
+
 class ExtractionService:
     def __init__(self):
-        self.client = instructor.from_openai(
-            AsyncOpenAI(
-                base_url=settings.llm_base_url,
-                api_key="ollama",
-                timeout=600,  # 10 minutes for large models
-            ),
-            mode=instructor.Mode.JSON,
+        # Per-backend clients and adaptive concurrency limits (see llm_router)
+        self.router = LLMRouter.from_settings()
+        self.selection_mode = settings.extraction_selection_mode
+        self.merger = entity_merger if settings.entity_merge_enabled else None
+        self.combined = settings.extraction_combined
+        self._query_vectors: Optional[Dict[str, np.ndarray]] = None
+        self.cache = (
+            LLMResponseCache(settings.llm_cache_path, settings.llm_cache_max_bytes)
+            if settings.llm_cache_enabled else None
         )
-        self.model_name = settings.llm_model_name
-        self.semaphore = asyncio.Semaphore(5)
+
+    async def _complete(self, response_model: Type[T], messages: List[dict]) -> T:
+        """
+        Run one structured completion, skipping the LLM when the response is cached.
+        The router picks the backend, hedges stragglers and fails over on errors.
+        Every call is recorded in llm_telemetry under the current stage's section.
+        """
+        call = LLMCallRecord(section=llm_telemetry.current_section(), response_model=response_model.__name__)
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.router.cache_identity, messages, response_model)
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                call.cached = True
+                llm_telemetry.record(call)
+                return response_model.model_validate_json(cached)
+
+        def on_failed_attempt(retry_state) -> None:
+            if isinstance(retry_state.outcome.exception(), (ValidationError, json.JSONDecodeError)):
+                call.validation_failures += 1
+
+        async def attempt(backend: LLMBackend) -> Tuple[T, Any, float]:
+            # Runs inside the backend's concurrency slot. Only invalid responses are re-asked
+            # here; transport and server errors fail over to another backend in the router.
+            retrying = AsyncRetrying(
+                stop=stop_after_attempt(LLM_MAX_ATTEMPTS),
+                retry=retry_if_exception_type((ValidationError, json.JSONDecodeError)),
+                reraise=True,
+                after=on_failed_attempt,
+            )
+            started = time.perf_counter()
+            try:
+                result, completion = await backend.client.chat.completions.create_with_completion(
+                    model=backend.model,
+                    response_model=response_model,
+                    messages=messages,
+                    max_retries=retrying,
+                    max_tokens=settings.llm_max_tokens,
+                )
+            finally:
+                call.attempts += retrying.statistics.get("attempt_number", 1)
+            return result, completion, time.perf_counter() - started
+
+        started = time.perf_counter()
+        prompt_tokens = sum(token_counter.count(m["content"]) for m in messages)
+        try:
+            (result, completion, latency), backend = await self.router.run(attempt, prompt_tokens)
+        except Exception as e:
+            call.error = type(e).__name__
+            call.latency_seconds = time.perf_counter() - started
+            self._record_usage(call, getattr(e, "total_usage", None))
+            raise
+        else:
+            call.backend = backend.name
+            call.latency_seconds = latency
+            # instructor accumulates usage over re-asks into the final completion
+            self._record_usage(call, getattr(completion, "usage", None))
+        finally:
+            llm_telemetry.record(call)
+
+        if key is not None:
+            await asyncio.to_thread(self.cache.put, key, backend.model, result.model_dump_json())
+        return result
+
+    @staticmethod
+    def _record_usage(call: LLMCallRecord, usage: Any) -> None:
+        if usage is not None:
+            call.prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            call.completion_tokens = getattr(usage, "completion_tokens", 0) or 0
 
     async def _extract_batch(
         self, 
@@ -148,42 +307,80 @@ class ExtractionService:
         prompt_instruction: str
     ) -> T:
         context_text = "\n\n".join([c.text for c in chunks])
-        max_context_chars = 20000
-        if len(context_text) > max_context_chars:
-            logger.warning(f"Truncating context from {len(context_text)} to {max_context_chars} chars")
-            context_text = context_text[:max_context_chars] + "\n\n[TRUNCATED]"
-        
-        try:
-            async with self.semaphore:
-                result = await self.client.chat.completions.create(
-                    model=self.model_name,
-                    response_model=response_model,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "You are a precise data extraction assistant specialized in university prospectuses. Extract ALL relevant data strictly based on the provided text. Return valid JSON with complete information. Do not skip or summarize - extract everything you find."
-                        },
-                        {
-                            "role": "user", 
-                            "content": f"{prompt_instruction}\n\nDATA:\n{context_text}"
-                        }
-                    ],
-                    max_retries=3,
-                )
-                return result
-        except Exception as e:
-            logger.error(f"Failed to extract batch for {response_model.__name__}: {type(e).__name__}: {e}")
-            return response_model()
+        result = await self._complete(
+            response_model,
+            [
+                {
+                    "role": "system", 
+                    "content": EXTRACTION_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user", 
+                    "content": f"{prompt_instruction}\n\nDATA:\n{context_text}"
+                }
+            ],
+        )
+        self._attach_sources(result, [c.chunk_id for c in chunks])
+        return result
+
+    @staticmethod
+    def _attach_sources(result: BaseModel, chunk_ids: List[str]) -> None:
+        """Record the batch's chunk IDs as provenance on every extracted entity (and nested program)."""
+        entities = getattr(result, "items", None)
+        for entity in entities if entities is not None else [result]:
+            if hasattr(entity, "source_chunk_ids"):
+                entity.source_chunk_ids = list(chunk_ids)
+            for program in getattr(entity, "programs", None) or []:
+                program.source_chunk_ids = list(chunk_ids)
+
+    async def _get_query_vectors(self) -> Dict[str, np.ndarray]:
+        """Embed SECTION_QUERIES once per process."""
+        if self._query_vectors is None:
+            names = list(SECTION_QUERIES)
+            vectors = await embedding_service.embed_texts([SECTION_QUERIES[n] for n in names])
+            self._query_vectors = dict(zip(names, vectors))
+        return self._query_vectors
+
+    def _select_semantic(
+        self,
+        chunks: List[TextChunk],
+        embeddings: np.ndarray,
+        query_vector: np.ndarray,
+    ) -> List[TextChunk]:
+        """
+        Rank chunks by cosine similarity to the section query and keep the best
+        ones, up to semantic_top_n chunks and semantic_token_budget tokens.
+        """
+        # Rows and query are unit vectors, so one matrix-vector product gives every cosine score
+        scores = embeddings @ query_vector
+        ranked = np.argsort(-scores)[:settings.semantic_top_n]
+
+        selected = []
+        used_tokens = 0
+        for index in ranked:
+            cost = token_counter.count(chunks[index].text)
+            if selected and used_tokens + cost > settings.semantic_token_budget:
+                break
+            selected.append(int(index))
+            used_tokens += cost
+
+        # Keep document order so related chunks stay adjacent within batches
+        return [chunks[i] for i in sorted(selected)]
 
     def _get_relevant_chunks(
         self, 
         chunks: List[TextChunk], 
         primary_tags: List[str],
-        fallback_tags: List[str] = None
+        fallback_tags: List[str] = None,
+        embeddings: Optional[np.ndarray] = None,
+        query_vector: Optional[np.ndarray] = None,
     ) -> List[TextChunk]:
         """
         Get relevant chunks with flexible filtering.
         Uses primary tags first, falls back to additional tags, then uses all chunks.
+        When chunk embeddings and a section query vector are given, everything after
+        the primary tags (fallback tags, keyword scan, all chunks) is replaced by
+        similarity ranking.
         """
         relevant = [
             c for c in chunks 
@@ -194,6 +391,13 @@ class ExtractionService:
             logger.info(f"Found {len(relevant)} chunks matching primary tags: {primary_tags}")
             return relevant
         
+        # Semantic mode: rank by similarity instead of the broad fallback tags
+        # (which usually include "general", i.e. most of a poorly labelled document)
+        if embeddings is not None and query_vector is not None:
+            relevant = self._select_semantic(chunks, embeddings, query_vector)
+            logger.info(f"Selected {len(relevant)} of {len(chunks)} chunks by similarity for {primary_tags}")
+            return relevant
+
         # Second try: fallback tags
         if fallback_tags:
             relevant = [
@@ -250,29 +454,39 @@ class ExtractionService:
         logger.info(f"Sampled {len(sampled)} chunks evenly from {len(chunks)} (step={step:.2f})")
         return sampled
 
-    async def _extract_section(
-        self, 
-        chunks: List[TextChunk], 
-        response_model: Type[T], 
-        primary_tags: List[str],
+    def _context_budget(self, response_model: Type[BaseModel], prompt_instruction: str) -> int:
+        """Tokens left for chunk text once prompt, response schema and completion are reserved."""
+        overhead = token_counter.count(
+            f"{EXTRACTION_SYSTEM_PROMPT}\n{prompt_instruction}\n\nDATA:\n"
+            # instructor's JSON mode sends the response schema along with the prompt
+            + json.dumps(response_model.model_json_schema())
+        )
+        budget = self.router.context_window - settings.llm_max_tokens - settings.llm_context_margin - overhead
+        return max(budget, 1)
+
+    def _pack_batches(
+        self,
+        chunks: List[TextChunk],
+        response_model: Type[BaseModel],
         prompt_instruction: str,
-        fallback_tags: List[str] = None,
-        batch_size: int = 5  # Smaller batches for better extraction with small models
-    ) -> T:
-        """Extract data for a section with flexible chunk selection."""
-        relevant_chunks = self._get_relevant_chunks(chunks, primary_tags, fallback_tags)
-        
-        # Process ALL chunks - no limiting
-        chunk_batches = [relevant_chunks[i:i + batch_size] for i in range(0, len(relevant_chunks), batch_size)]
-        logger.info(f"Processing {len(relevant_chunks)} chunks for {response_model.__name__} in {len(chunk_batches)} batches (batch_size={batch_size})")
-        
-        results = []
-        for i, batch in enumerate(chunk_batches):
-            logger.info(f"  Batch {i+1}/{len(chunk_batches)} for {response_model.__name__}...")
-            result = await self._extract_batch(batch, response_model, prompt_instruction)
-            results.append(result)
-        
-        # Aggregate results
+    ) -> List[List[TextChunk]]:
+        """Pack chunks, in order, into as few requests as fit the context budget; chunks are never cut."""
+        budget = self._context_budget(response_model, prompt_instruction)
+        batches = [
+            [chunks[i] for i in indices]
+            for indices in pack_by_tokens([c.text for c in chunks], budget, token_counter.count)
+        ]
+        for batch in batches:
+            if len(batch) == 1 and token_counter.count(batch[0].text) > budget:
+                logger.warning(
+                    f"Chunk {batch[0].chunk_id} exceeds the {budget}-token context budget; sending it on its own"
+                )
+        logger.info(f"Packed {len(chunks)} chunks into {len(batches)} requests (budget={budget} tokens)")
+        return batches
+
+    @staticmethod
+    def _merge_batch_results(response_model: Type[T], results: List[Any], warnings: Optional[List[str]] = None) -> T:
+        """Merge a section's batch results, in order; exceptions are logged and recorded in `warnings`."""
         final_result = response_model()
         list_field = None
         for name, field in response_model.model_fields.items():
@@ -280,9 +494,12 @@ class ExtractionService:
                 list_field = name
                 break
                 
-        for res in results:
+        for i, res in enumerate(results):
             if isinstance(res, Exception):
-                logger.error(f"Batch failed: {res}")
+                message = f"{response_model.__name__} batch {i+1}/{len(results)} failed: {type(res).__name__}: {res}"
+                logger.error(message)
+                if warnings is not None:
+                    warnings.append(message)
                 continue
             
             # Merge lists
@@ -302,10 +519,141 @@ class ExtractionService:
                     if final_result.important_dates is None:
                         final_result.important_dates = []
                     final_result.important_dates.extend(res.important_dates)
+                final_result.source_chunk_ids.extend(res.source_chunk_ids)
 
         return final_result
 
-    async def extract_university_info(self, chunks: List[TextChunk]) -> UniversityInfo:
+    async def _extract_section(
+        self, 
+        chunks: List[TextChunk], 
+        response_model: Type[T], 
+        primary_tags: List[str],
+        prompt_instruction: str,
+        fallback_tags: List[str] = None,
+        warnings: Optional[List[str]] = None,
+        embeddings: Optional[np.ndarray] = None,
+        query_vector: Optional[np.ndarray] = None,
+        only_chunk_ids: Optional[Set[str]] = None,
+    ) -> T:
+        """
+        Extract data for a section with flexible chunk selection.
+
+        Batches are dispatched concurrently (bounded by the router's backend limits) and merged
+        in document order. A failed batch is logged and recorded in `warnings`
+        without affecting the others. `only_chunk_ids` limits extraction to those
+        of the selected chunks (incremental re-extraction).
+        """
+        relevant_chunks = self._get_relevant_chunks(chunks, primary_tags, fallback_tags, embeddings, query_vector)
+        if only_chunk_ids is not None:
+            relevant_chunks = [c for c in relevant_chunks if c.chunk_id in only_chunk_ids]
+        
+        # Process ALL chunks - no limiting
+        chunk_batches = self._pack_batches(relevant_chunks, response_model, prompt_instruction)
+        logger.info(f"Processing {len(relevant_chunks)} chunks for {response_model.__name__} in {len(chunk_batches)} batches")
+        
+        # gather() preserves submission order, so results line up with chunk_batches
+        results = await asyncio.gather(
+            *[self._extract_batch(batch, response_model, prompt_instruction) for batch in chunk_batches],
+            return_exceptions=True,
+        )
+        return self._merge_batch_results(response_model, results, warnings)
+
+    async def _extract_section_incremental(
+        self,
+        previous: Optional[BaseModel],
+        diff: ChunkDiff,
+        chunks: List[TextChunk],
+        response_model: Type[T],
+        **section_kwargs,
+    ) -> T:
+        """
+        Re-extract a section of a revised prospectus from its previous result.
+
+        Previous entities whose source chunks all survive are kept. Only the added
+        chunks, plus the surviving chunks of entities that lost a source chunk, are
+        sent to the LLM, and the new entities are appended to the kept ones. Without
+        provenance on every previous entity the whole section is re-extracted;
+        AdmissionInfo is a single merged object, so it is either kept or redone.
+        """
+        entities = [] if previous is None else getattr(previous, "items", [previous])
+        if previous is None or any(not e.source_chunk_ids for e in entities):
+            logger.info(f"{response_model.__name__}: no usable provenance, re-extracting the whole section")
+            return await self._extract_section(chunks, response_model, **section_kwargs)
+
+        kept, dirty = [], set(diff.added_ids)
+        for entity in entities:
+            if diff.removed_ids.intersection(entity.source_chunk_ids):
+                dirty.update(cid for cid in entity.source_chunk_ids if cid not in diff.removed_ids)
+            else:
+                kept.append(entity)
+
+        if response_model is AdmissionInfo:
+            selected = self._get_relevant_chunks(
+                chunks, section_kwargs["primary_tags"], section_kwargs.get("fallback_tags"),
+                section_kwargs.get("embeddings"), section_kwargs.get("query_vector"),
+            )
+            if kept and not any(c.chunk_id in dirty for c in selected):
+                logger.info("AdmissionInfo: unaffected by the revision, keeping previous result")
+                return previous
+            return await self._extract_section(chunks, response_model, **section_kwargs)
+
+        logger.info(
+            f"{response_model.__name__}: keeping {len(kept)} of {len(entities)} entities, "
+            f"re-extracting {len(dirty)} changed chunks"
+        )
+        result = await self._extract_section(chunks, response_model, only_chunk_ids=dirty, **section_kwargs)
+        result.items = kept + result.items
+        return result
+
+    async def _extract_combined(
+        self,
+        chunks: List[TextChunk],
+        selections: Dict[str, List[TextChunk]],
+        warnings: Dict[str, List[str]],
+    ) -> Dict[str, BaseModel]:
+        """
+        Extract several sections with shared calls (see extraction_planner.plan_calls):
+        each chunk is sent once, with every section that selected it. Returns each
+        section's merged result; a failed call is recorded in the warnings of every
+        section it covered.
+        """
+        calls = plan_calls(
+            chunks, selections, lambda sections: self._context_budget(*_call_spec(sections)), token_counter.count,
+        )
+        separate = sum(
+            len(pack_by_tokens([c.text for c in selected], self._context_budget(*_call_spec((name,))), token_counter.count))
+            for name, selected in selections.items()
+        )
+        logger.info(f"Planned {len(calls)} combined requests for {list(selections)} (separately: {separate})")
+
+        async def run(call: ExtractionCall) -> BaseModel:
+            # Runs in its own task under gather(), so the section tag stays local to the call
+            llm_telemetry.set_section("+".join(call.sections))
+            response_model, prompt = _call_spec(call.sections)
+            return await self._extract_batch(call.chunks, response_model, prompt)
+
+        results = await asyncio.gather(*[run(call) for call in calls], return_exceptions=True)
+
+        per_section: Dict[str, List[Any]] = {name: [] for name in selections}
+        for call, result in zip(calls, results):
+            if isinstance(result, Exception):
+                for name in call.sections:
+                    per_section[name].append(result)
+                continue
+            for name, part in _split_combined(result, call.sections).items():
+                if part is not None:
+                    self._attach_sources(part, [c.chunk_id for c in call.chunks])
+                per_section[name].append(part)
+        return {
+            name: self._merge_batch_results(SECTION_STAGES[name][0], per_section[name], warnings[name])
+            for name in selections
+        }
+
+    @staticmethod
+    async def _combined_section(combined: "asyncio.Task[Dict[str, BaseModel]]", name: str) -> BaseModel:
+        return (await combined)[name]
+
+    async def extract_university_info(self, chunks: List[TextChunk], warnings: Optional[List[str]] = None) -> UniversityInfo:
         """Extract university name, short name, and location."""
         # Look for chunks mentioning university name - check first 30 chunks
         uni_chunks = [
@@ -320,29 +668,89 @@ class ExtractionService:
             context_text = context_text[:4000]
 
         try:
-            async with self.semaphore:
-                return await self.client.chat.completions.create(
-                    model=self.model_name,
-                    response_model=UniversityInfo,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "Extract the university's basic information from the prospectus. Return valid JSON."
-                        },
-                        {
-                            "role": "user",
-                            "content": f"{PROMPTS['university_info']}\n\nDATA:\n{context_text}"
-                        }
-                    ],
-                    max_retries=3,
-                )
+            return await self._complete(
+                UniversityInfo,
+                [
+                    {
+                        "role": "system",
+                        "content": "Extract the university's basic information from the prospectus. Return valid JSON."
+                    },
+                    {
+                        "role": "user",
+                        "content": f"{PROMPTS['university_info']}\n\nDATA:\n{context_text}"
+                    }
+                ],
+            )
         except Exception as e:
-            logger.error(f"Failed to extract university info: {type(e).__name__}: {e}")
+            message = f"Failed to extract university info: {type(e).__name__}: {e}"
+            logger.error(message)
+            if warnings is not None:
+                warnings.append(message)
             return UniversityInfo()
 
-    async def extract_all(self, chunks: List[TextChunk]) -> UniversityExtraction:
-        """Main extraction pipeline with generic prompts."""
+    async def _run_stage(
+        self,
+        name: str,
+        stage: Callable[[], Awaitable[Any]],
+        default: Any,
+        warnings: List[str],
+        on_complete: Optional[Callable[[str, Any], None]] = None,
+    ) -> Any:
+        """
+        Run one extraction stage in isolation; a failure yields `default` instead of propagating.
+        `on_complete` runs in a worker thread, and only for a clean result, i.e. the stage added no warnings
+        (no failed batches), so a checkpointed stage never hides partial data.
+        """
+        logger.info(f"Stage '{name}' started")
+        # This coroutine runs in its own task, so the section tag stays local to the stage
+        llm_telemetry.set_section(name)
+        started = time.monotonic()
+        try:
+            result = await stage()
+        except Exception as e:
+            logger.error(f"Stage '{name}' failed: {type(e).__name__}: {e}")
+            warnings.append(f"Stage '{name}' failed: {type(e).__name__}: {e}")
+            return default
+        logger.info(f"Stage '{name}' finished in {time.monotonic() - started:.1f}s")
+        if on_complete is not None and not warnings:
+            # Checkpoint writes are file I/O; keep them off the loop while other stages' requests are in flight
+            try:
+                await asyncio.to_thread(on_complete, name, result)
+            except Exception as e:
+                # A missing checkpoint only costs a re-run on retry; the result itself is good
+                logger.warning(f"Stage '{name}' could not be checkpointed: {type(e).__name__}: {e}")
+        return result
+
+    async def extract_all(
+        self,
+        chunks: List[TextChunk],
+        priority: Optional[List[str]] = None,
+        embeddings: Optional[np.ndarray] = None,
+        resume: Optional[Dict[str, BaseModel]] = None,
+        on_stage_complete: Optional[Callable[[str, BaseModel], None]] = None,
+        previous: Optional[UniversityExtraction] = None,
+        diff: Optional[ChunkDiff] = None,
+    ) -> UniversityExtraction:
+        """
+        Main extraction pipeline with generic prompts.
+
+        All stages are scheduled together and share the LLM concurrency budget
+        (the router's backend limits). `priority` lists stage names in the order their requests
+        should queue for that budget; unlisted stages follow in default order.
+        In "semantic" selection mode, `embeddings` (row i for chunks[i]) are used to
+        pick chunks for sections whose labels don't match; they are computed here
+        when not supplied.
+        Stages present in `resume` (stage name -> result, see STAGE_MODELS) are not
+        re-run; `on_stage_complete` is called with each stage that finishes cleanly,
+        so callers can checkpoint it.
+        With `previous` (the last revision's extraction) and `diff` (its chunks vs
+        these), sections are re-extracted incrementally; see _extract_section_incremental.
+        With extraction_combined, the pending sections share one set of requests
+        (see _extract_combined) instead of each sending its own chunks.
+        """
         logger.info(f"Starting extraction on {len(chunks)} chunks")
+        # Batches are packed for the backends' real context length
+        await self.router.resolve_context_window()
         
         # Log section distribution
         section_counts = {}
@@ -350,81 +758,137 @@ class ExtractionService:
             label = c.section_label or "unknown"
             section_counts[label] = section_counts.get(label, 0) + 1
         logger.info(f"Chunk section distribution: {section_counts}")
+        warnings: List[str] = []
+        resume = resume or {}
+        if resume:
+            logger.info(f"Resuming with completed stages: {list(resume)}")
+        pending_sections = [name for name in SECTION_STAGES if name not in resume]
+        if previous is not None and previous.metadata.warnings:
+            # Entities missing from a partly failed extraction would never be recovered
+            logger.info("Previous extraction has warnings; running a full extraction")
+            previous = None
+        if previous is not None and diff is not None:
+            logger.info(f"Incremental extraction against previous revision: {diff.summary()}")
+
+        query_vectors: Dict[str, np.ndarray] = {}
+        if self.selection_mode == "semantic" and chunks and pending_sections:
+            try:
+                if embeddings is None:
+                    embeddings = await embedding_service.embed_chunks(chunks)
+                query_vectors = await self._get_query_vectors()
+            except Exception as e:
+                logger.error(f"Semantic selection unavailable, using keyword fallback: {type(e).__name__}: {e}")
+                warnings.append(f"Semantic chunk selection unavailable: {type(e).__name__}")
+                embeddings = None
+
+        # Per-stage warning lists: concurrent stages must not see each other's failures
+        stage_warnings: Dict[str, List[str]] = {name: [] for name in STAGE_MODELS}
+        stages: Dict[str, Tuple[Callable[[], Awaitable[Any]], Any]] = {
+            "university_info": (
+                partial(self.extract_university_info, chunks, warnings=stage_warnings["university_info"]),
+                UniversityInfo(),
+            ),
+        }
+        for name, (response_model, primary_tags, fallback_tags) in SECTION_STAGES.items():
+            if previous is not None and diff is not None:
+                previous_value = getattr(previous, SECTION_FIELDS[name])
+                if response_model is not AdmissionInfo:
+                    previous_value = response_model(items=previous_value)
+                extract = partial(self._extract_section_incremental, previous_value, diff)
+            else:
+                extract = self._extract_section
+            stages[name] = (
+                partial(
+                    extract,
+                    chunks,
+                    response_model,
+                    primary_tags=primary_tags,
+                    fallback_tags=fallback_tags,
+                    prompt_instruction=PROMPTS[name],
+                    warnings=stage_warnings[name],
+                    embeddings=embeddings if query_vectors else None,
+                    query_vector=query_vectors.get(name),
+                ),
+                # Admissions has no list container; a failed stage is reported as missing
+                None if response_model is AdmissionInfo else response_model(),
+            )
 
-        # Step 1: University Info
-        logger.info("Step 1/5: Extracting university info...")
-        try:
-            uni_info = await self.extract_university_info(chunks)
-        except Exception as e:
-            logger.error(f"University info extraction failed: {e}")
-            uni_info = UniversityInfo()
+        # Combined mode: pending sections share requests, each chunk sent once with every
+        # section that selected it. Incremental runs send few chunks and keep per-section calls.
+        combined_selections: Dict[str, List[TextChunk]] = {}
+        if self.combined and len(pending_sections) > 1 and not (previous is not None and diff is not None):
+            for name in pending_sections:
+                _, primary_tags, fallback_tags = SECTION_STAGES[name]
+                combined_selections[name] = self._get_relevant_chunks(
+                    chunks, primary_tags, fallback_tags,
+                    embeddings if query_vectors else None, query_vectors.get(name),
+                )
 
-        # Step 2: Departments and Programs
-        logger.info("Step 2/5: Extracting departments and programs...")
-        try:
-            dept_data = await self._extract_section(
-                chunks, 
-                DepartmentList, 
-                primary_tags=["departments"],
-                fallback_tags=["programs", "curriculum", "general"],
-                prompt_instruction=PROMPTS["departments"]
-            )
-        except Exception as e:
-            logger.error(f"Department extraction failed: {e}")
-            dept_data = DepartmentList()
-        
-        # Step 3: Facilities
-        logger.info("Step 3/5: Extracting facilities...")
-        try:
-            fac_data = await self._extract_section(
-                chunks, 
-                FacilityList, 
-                primary_tags=["facilities"],
-                fallback_tags=["departments", "general"],
-                prompt_instruction=PROMPTS["facilities"]
-            )
-        except Exception as e:
-            logger.error(f"Facility extraction failed: {e}")
-            fac_data = FacilityList()
-        
-        # Step 4: Fees
-        logger.info("Step 4/5: Extracting fees...")
-        try:
-            fee_data = await self._extract_section(
-                chunks, 
-                FeeList, 
-                primary_tags=["fees"],
-                fallback_tags=["admissions", "general"],
-                prompt_instruction=PROMPTS["fees"]
-            )
-        except Exception as e:
-            logger.error(f"Fee extraction failed: {e}")
-            fee_data = FeeList()
-        
-        # Step 5: Admissions
-        logger.info("Step 5/5: Extracting admissions...")
+        order = [name for name in (priority or []) if name in stages]
+        order += [name for name in DEFAULT_STAGE_PRIORITY if name not in order]
+        order = [name for name in order if name not in resume]
+        logger.info(f"Scheduling extraction stages: {order}")
+
+        # Tasks start in creation order, so higher-priority stages reach the backend limits first.
+        # They copy the current context, so every call they make reports to this collector.
+        usage = LLMUsageCollector()
+        usage_token = llm_telemetry.bind_collector(usage)
         try:
-            admissions = await self._extract_section(
-                chunks, 
-                AdmissionInfo, 
-                primary_tags=["admissions"],
-                fallback_tags=["requirements", "general"],
-                prompt_instruction=PROMPTS["admissions"]
+            combined = None
+            tasks = {}
+            for name in order:
+                if name in combined_selections and combined is None:
+                    # The shared requests queue in the place of their highest-priority section
+                    combined = asyncio.create_task(self._extract_combined(chunks, combined_selections, stage_warnings))
+                    for section in combined_selections:
+                        stages[section] = (partial(self._combined_section, combined, section), stages[section][1])
+                tasks[name] = asyncio.create_task(
+                    self._run_stage(name, *stages[name], stage_warnings[name], on_stage_complete)
+                )
+        finally:
+            llm_telemetry.unbind_collector(usage_token)
+        await asyncio.gather(*tasks.values())
+
+        results = {**resume, **{name: task.result() for name, task in tasks.items()}}
+        for name in STAGE_MODELS:
+            warnings.extend(stage_warnings[name])
+
+        uni_info = results["university_info"]
+        dept_data = results["departments"]
+        fac_data = results["facilities"]
+        fee_data = results["fees"]
+        admissions = results["admissions"]
+
+        departments, facilities, fees = dept_data.items, fac_data.items, fee_data.items
+        if self.merger is not None:
+            # Overlapping chunks and repeated sections yield the same entity from several batches
+            departments = self.merger.merge_departments(departments)
+            facilities = self.merger.merge_facilities(facilities)
+            fees = self.merger.merge_fees(fees)
+            logger.info(
+                f"Merged duplicates: departments {len(dept_data.items)} -> {len(departments)}, "
+                f"facilities {len(fac_data.items)} -> {len(facilities)}, fees {len(fee_data.items)} -> {len(fees)}"
             )
-        except Exception as e:
-            logger.error(f"Admission extraction failed: {e}")
-            admissions = None
 
         # Log extraction results
         logger.info(f"Extracted university: {uni_info.name}")
-        logger.info(f"Extracted {len(dept_data.items)} departments")
-        logger.info(f"Extracted {len(fac_data.items)} facilities")
-        logger.info(f"Extracted {len(fee_data.items)} fees")
+        logger.info(f"Extracted {len(departments)} departments")
+        logger.info(f"Extracted {len(facilities)} facilities")
+        logger.info(f"Extracted {len(fees)} fees")
+        llm_usage = usage.summary()
+        if self.cache is not None:
+            # From this run's calls: the cache's own counters span every job the worker has run
+            hits, lookups = llm_usage["all"]["cache_hits"], llm_usage["all"]["calls"]
+            logger.info(
+                f"LLM cache stats: hits {hits}, misses {lookups - hits}, "
+                f"hit_rate {hits / lookups if lookups else 0.0:.2f}"
+            )
+        logger.info(f"LLM usage: {llm_usage['all']}")
 
         # Build metadata with realistic confidence scores
-        dept_confidence = min(0.9, 0.3 + (len(dept_data.items) * 0.03)) if dept_data.items else 0.0
-        fac_confidence = min(0.9, 0.3 + (len(fac_data.items) * 0.05)) if fac_data.items else 0.0
-        fee_confidence = min(0.9, 0.3 + (len(fee_data.items) * 0.1)) if fee_data.items else 0.0
+        dept_confidence = min(0.9, 0.3 + (len(departments) * 0.03)) if departments else 0.0
+        fac_confidence = min(0.9, 0.3 + (len(facilities) * 0.05)) if facilities else 0.0
+        fee_confidence = min(0.9, 0.3 + (len(fees) * 0.1)) if fees else 0.0
         adm_confidence = 0.7 if admissions and admissions.eligibility_criteria else 0.0
 
         metadata = ExtractionMetaData(
@@ -436,16 +900,18 @@ class ExtractionService:
                 "facilities": fac_confidence,
                 "fees": fee_confidence,
                 "admissions": adm_confidence,
-            }
+            },
+            warnings=warnings,
+            llm_usage=llm_usage,
         )
 
         return UniversityExtraction(
             university_name=uni_info.name,
             university_short_name=uni_info.short_name,
             location=uni_info.location,
-            departments=dept_data.items,
-            facilities=fac_data.items,
-            fee_structure=fee_data.items,
+            departments=departments,
+            facilities=facilities,
+            fee_structure=fees,
             admissions=admissions,
             contact=None,
             metadata=metadata
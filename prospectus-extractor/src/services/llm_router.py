@@ -0,0 +1,276 @@
+import re
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple, TypeVar
+
+import httpx
+import instructor
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+
+from ..config import LLMBackendConfig, settings
+from . import llm_telemetry
+from .adaptive_limiter import AdaptiveLimiter, LimiterFeedbackTransport
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+# Latency samples kept per backend for the hedging percentile
+LATENCY_WINDOW = 200
+LATENCY_ALPHA = 0.2
+# Cap on the doubling cooldown of a failing backend
+MAX_COOLDOWN_SECONDS = 300.0
+
+
+class LLMBackend:
+    """An OpenAI-compatible endpoint with its own client, concurrency limiter and latency statistics."""
+
+    def __init__(self, config: LLMBackendConfig, cooldown: float = settings.llm_backend_cooldown):
+        self.name = config.name
+        self.model = config.model
+        self.cost_per_1k_tokens = config.cost_per_1k_tokens
+        self.kind = config.kind
+        self.base_url = config.base_url
+        # None for Ollama until read from the server (see resolve_context_window)
+        self.context_window = config.context_window or (None if config.kind == "ollama" else settings.llm_context_window)
+        initial = config.max_concurrency or settings.llm_max_concurrency
+        adaptive = settings.llm_adaptive_concurrency
+        self.limiter = AdaptiveLimiter(
+            f"llm:{config.name}",
+            initial=initial,
+            min_limit=settings.llm_concurrency_min if adaptive else initial,
+            max_limit=settings.llm_concurrency_max if adaptive else initial,
+            latency_tolerance=settings.llm_latency_tolerance,
+        )
+        self.client = instructor.from_openai(
+            AsyncOpenAI(
+                base_url=config.base_url,
+                api_key=config.api_key,
+                timeout=600,  # 10 minutes for large models
+                http_client=httpx.AsyncClient(transport=LimiterFeedbackTransport(self.limiter)),
+            ),
+            mode=instructor.Mode.JSON,
+        )
+        self.cooldown = cooldown
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.latency_ewma: Optional[float] = None
+        # Requests routed here and not finished, counted from dispatch rather than from
+        # slot acquisition so a burst of selections sees the queue it is building
+        self.assigned = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+
+    async def resolve_context_window(self) -> int:
+        """
+        The context length this backend actually runs with. Ollama's /v1 endpoint ignores
+        per-request options and silently drops the front of a longer prompt, so its
+        window is the model's num_ctx, which must be set in the Modelfile.
+        """
+        if self.context_window is None:
+            root = re.sub(r"/v1/?$", "", self.base_url.rstrip("/"))
+            async with httpx.AsyncClient(timeout=30) as client:
+                response = await client.post(f"{root}/api/show", json={"model": self.model})
+                response.raise_for_status()
+            match = re.search(r"^num_ctx\s+(\d+)", response.json().get("parameters", ""), re.MULTILINE)
+            if match is None:
+                raise ValueError(
+                    f"Ollama model {self.model} on backend {self.name} does not set num_ctx, so it runs with the "
+                    f"server's default context; add 'PARAMETER num_ctx <tokens>' to its Modelfile "
+                    f"or set context_window in llm_backends"
+                )
+            self.context_window = int(match.group(1))
+        return self.context_window
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def expected_seconds(self, default_latency: float) -> float:
+        """Expected completion time of a new request: queueing for a slot plus one service time."""
+        latency = self.latency_ewma if self.latency_ewma is not None else default_latency
+        ahead = self.assigned + 1 - self.limiter.limit
+        return (max(0, ahead) / self.limiter.limit + 1) * latency
+
+    def latency_percentile(self, percentile: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.latency_ewma = latency if self.latency_ewma is None else (
+            self.latency_ewma + LATENCY_ALPHA * (latency - self.latency_ewma)
+        )
+        self.consecutive_failures = 0
+
+    def record_failure(self, error: Exception) -> None:
+        # Only transport and server errors say something about the backend; a response that
+        # failed validation is the model's problem and is retried elsewhere without penalty
+        if not isinstance(error, (APIConnectionError, APIStatusError)):
+            return
+        # Requests that were in flight when the backend went down fail together; count one
+        # failure per cooldown window so a single outage does not escalate to the maximum
+        if not self.healthy:
+            return
+        self.consecutive_failures += 1
+        cooldown = min(self.cooldown * 2 ** (self.consecutive_failures - 1), MAX_COOLDOWN_SECONDS)
+        self.unhealthy_until = time.monotonic() + cooldown
+        logger.warning(f"LLM backend {self.name} failed ({type(error).__name__}); avoiding it for {cooldown:.0f}s")
+
+
+class LLMRouter:
+    """
+    Dispatches LLM requests across several OpenAI-compatible backends.
+
+    Each request goes to the healthy backend with the lowest score: expected
+    completion time (queue depth over the backend's limit, times its latency
+    average) plus `cost_weight` seconds per unit of prompt cost. A request still
+    outstanding after its backend's `hedge_percentile` latency is duplicated on
+    another backend with a free slot and the first answer wins. A failed request
+    fails over to the next best backend, up to `failover_attempts` distinct
+    backends; backends failing with transport or server errors cool down.
+    """
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        cost_weight: float = settings.llm_router_cost_weight,
+        hedge_percentile: float = settings.llm_hedge_percentile,
+        hedge_min_samples: int = settings.llm_hedge_min_samples,
+        failover_attempts: int = settings.llm_failover_attempts,
+    ):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.cost_weight = cost_weight
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.failover_attempts = max(1, failover_attempts)
+        self.context_window: Optional[int] = None
+
+    @classmethod
+    def from_settings(cls) -> "LLMRouter":
+        configs = list(settings.llm_backends)
+        if not configs:
+            configs.append(LLMBackendConfig(name="local", base_url=settings.llm_base_url, model=settings.llm_model_name))
+            if settings.groq_api_key:
+                configs.append(LLMBackendConfig(
+                    name="groq",
+                    base_url=settings.groq_base_url,
+                    model=settings.groq_model_name,
+                    api_key=settings.groq_api_key,
+                    kind="openai",
+                    cost_per_1k_tokens=settings.groq_cost_per_1k_tokens,
+                ))
+        logger.info(f"LLM backends: {[f'{c.name} ({c.model})' for c in configs]}")
+        return cls([LLMBackend(config) for config in configs])
+
+    async def resolve_context_window(self) -> int:
+        """Smallest context length across backends, since any of them may serve a request; read once."""
+        if self.context_window is None:
+            windows = await asyncio.gather(*(b.resolve_context_window() for b in self.backends))
+            context_window = min(windows)
+            if context_window <= settings.llm_max_tokens + settings.llm_context_margin:
+                raise ValueError(
+                    f"Context window of {context_window} tokens leaves no room for a prompt after "
+                    f"llm_max_tokens ({settings.llm_max_tokens}) and llm_context_margin ({settings.llm_context_margin})"
+                )
+            logger.info(f"LLM context windows: {dict(zip((b.name for b in self.backends), windows))}; packing for {context_window}")
+            self.context_window = context_window
+        return self.context_window
+
+    @property
+    def cache_identity(self) -> str:
+        """Models that may answer a request, for response cache keys."""
+        return "+".join(sorted({b.model for b in self.backends}))
+
+    def _default_latency(self) -> float:
+        # Optimistic for backends without samples, so every backend gets tried
+        known = [b.latency_ewma for b in self.backends if b.latency_ewma is not None]
+        return min(known) if known else 1.0
+
+    def _score(self, backend: LLMBackend, prompt_tokens: int, default_latency: float) -> float:
+        cost = backend.cost_per_1k_tokens * prompt_tokens / 1000
+        return backend.expected_seconds(default_latency) + self.cost_weight * cost
+
+    def select(self, prompt_tokens: int, exclude: List[LLMBackend] = (), free_only: bool = False) -> Optional[LLMBackend]:
+        candidates = [b for b in self.backends if b not in exclude and (not free_only or b.limiter.available)]
+        # Unhealthy backends are still used when nothing else is left
+        candidates = [b for b in candidates if b.healthy] or candidates
+        if not candidates:
+            return None
+        default_latency = self._default_latency()
+        return min(candidates, key=lambda b: self._score(b, prompt_tokens, default_latency))
+
+    async def run(self, request: Callable[[LLMBackend], Awaitable[R]], prompt_tokens: int) -> Tuple[R, LLMBackend]:
+        """Run `request` on the best backend, with hedging and failover; returns the result and its backend."""
+        tried: List[LLMBackend] = []
+        while True:
+            backend = self.select(prompt_tokens, exclude=tried)
+            tried.append(backend)
+            try:
+                return await self._run_hedged(request, backend, prompt_tokens, tried)
+            except Exception as e:
+                if len(tried) >= self.failover_attempts or self.select(prompt_tokens, exclude=tried) is None:
+                    raise
+                logger.warning(f"LLM request on {backend.name} failed ({type(e).__name__}: {e}); failing over")
+
+    def _dispatch(self, request: Callable[[LLMBackend], Awaitable[R]], backend: LLMBackend) -> "asyncio.Task[Tuple[R, LLMBackend]]":
+        backend.assigned += 1
+        return asyncio.create_task(self._execute(request, backend))
+
+    async def _execute(self, request: Callable[[LLMBackend], Awaitable[R]], backend: LLMBackend) -> Tuple[R, LLMBackend]:
+        try:
+            async with backend.limiter:
+                started = time.monotonic()
+                try:
+                    result = await request(backend)
+                except Exception as e:
+                    backend.record_failure(e)
+                    llm_telemetry.record_backend_request(backend.name, "error")
+                    raise
+                backend.record_success(time.monotonic() - started)
+                llm_telemetry.record_backend_request(backend.name, "ok")
+                return result, backend
+        finally:
+            backend.assigned -= 1
+
+    def _hedge_delay(self, backend: LLMBackend) -> Optional[float]:
+        if not self.hedge_percentile or len(self.backends) < 2 or len(backend.latencies) < self.hedge_min_samples:
+            return None
+        return backend.latency_percentile(self.hedge_percentile)
+
+    async def _run_hedged(
+        self,
+        request: Callable[[LLMBackend], Awaitable[R]],
+        backend: LLMBackend,
+        prompt_tokens: int,
+        tried: List[LLMBackend],
+    ) -> Tuple[R, LLMBackend]:
+        tasks = [self._dispatch(request, backend)]
+        try:
+            delay = self._hedge_delay(backend)
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                # Only hedge onto a backend that can start right away; queueing a duplicate adds load, not speed
+                hedge = None if tasks[0].done() else self.select(prompt_tokens, exclude=tried, free_only=True)
+                if hedge is not None and hedge.healthy:
+                    logger.info(f"Hedging request on {hedge.name}: {backend.name} exceeded p{self.hedge_percentile * 100:.0f} ({delay:.1f}s)")
+                    llm_telemetry.record_backend_request(hedge.name, "hedge")
+                    tried.append(hedge)
+                    tasks.append(self._dispatch(request, hedge))
+
+            pending, errors = set(tasks), []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[0]
+        finally:
+            # The losing duplicate (or everything, if we were cancelled) is abandoned
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,155 @@
+import logging
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, start_http_server
+except ImportError:  # metrics are optional; per-ingestion summaries still work
+    Counter = Gauge = Histogram = start_http_server = None
+
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+if Counter is not None:
+    LLM_CALLS = Counter(
+        "prospectus_llm_calls_total", "LLM extraction calls", ["section", "response_model", "outcome"]
+    )
+    LLM_TOKENS = Counter(
+        "prospectus_llm_tokens_total", "Tokens used by LLM extraction calls", ["section", "response_model", "kind"]
+    )
+    LLM_RETRIES = Counter(
+        "prospectus_llm_retries_total", "LLM call attempts beyond the first", ["section", "response_model"]
+    )
+    LLM_VALIDATION_FAILURES = Counter(
+        "prospectus_llm_validation_failures_total",
+        "LLM responses rejected by response_model validation",
+        ["section", "response_model"],
+    )
+    LLM_LATENCY = Histogram(
+        "prospectus_llm_call_seconds", "LLM call latency, excluding concurrency-limit waits",
+        ["section", "response_model"], buckets=LATENCY_BUCKETS,
+    )
+    LLM_BACKEND_REQUESTS = Counter(
+        "prospectus_llm_backend_requests_total", "LLM requests per routed backend", ["backend", "outcome"]
+    )
+    LLM_CONCURRENCY_LIMIT = Gauge(
+        "prospectus_llm_concurrency_limit", "Current in-flight limit of an LLM concurrency limiter", ["limiter"]
+    )
+    LLM_IN_FLIGHT = Gauge(
+        "prospectus_llm_requests_in_flight", "LLM requests holding a concurrency slot", ["limiter"]
+    )
+
+# Set per extraction stage / per extract_all run; asyncio tasks inherit them
+_section: ContextVar[str] = ContextVar("llm_section", default="unknown")
+_collector: ContextVar[Optional["LLMUsageCollector"]] = ContextVar("llm_usage_collector", default=None)
+
+
+@dataclass
+class LLMCallRecord:
+    section: str
+    response_model: str
+    cached: bool = False
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_seconds: float = 0.0
+    attempts: int = 0
+    validation_failures: int = 0
+    error: Optional[str] = None
+    backend: Optional[str] = None
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+
+@dataclass
+class LLMUsageCollector:
+    """Collects the LLM calls of one extract_all run."""
+    records: List[LLMCallRecord] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, dict]:
+        """Totals per section, plus "all"; stored in ExtractionMetaData.llm_usage."""
+        by_section: Dict[str, List[LLMCallRecord]] = {}
+        for record in self.records:
+            by_section.setdefault(record.section, []).append(record)
+        summary = {section: _summarize(records) for section, records in by_section.items()}
+        summary["all"] = _summarize(self.records)
+        return summary
+
+
+def _summarize(records: List[LLMCallRecord]) -> dict:
+    latencies = [r.latency_seconds for r in records if not r.cached]
+    backends: Dict[str, int] = {}
+    for r in records:
+        if r.backend:
+            backends[r.backend] = backends.get(r.backend, 0) + 1
+    return {
+        "calls": len(records),
+        "cache_hits": sum(r.cached for r in records),
+        "errors": sum(r.error is not None for r in records),
+        "prompt_tokens": sum(r.prompt_tokens for r in records),
+        "completion_tokens": sum(r.completion_tokens for r in records),
+        "retries": sum(r.retries for r in records),
+        "validation_failures": sum(r.validation_failures for r in records),
+        "latency_seconds": round(sum(latencies), 3),
+        "max_latency_seconds": round(max(latencies), 3) if latencies else 0.0,
+        "backends": backends,
+    }
+
+
+def current_section() -> str:
+    return _section.get()
+
+
+def set_section(name: str) -> Token:
+    return _section.set(name)
+
+
+def bind_collector(collector: LLMUsageCollector) -> Token:
+    return _collector.set(collector)
+
+
+def unbind_collector(token: Token) -> None:
+    _collector.reset(token)
+
+
+def record(call: LLMCallRecord) -> None:
+    collector = _collector.get()
+    if collector is not None:
+        collector.records.append(call)
+    if Counter is None:
+        return
+    labels = (call.section, call.response_model)
+    outcome = "cached" if call.cached else ("error" if call.error else "ok")
+    LLM_CALLS.labels(*labels, outcome).inc()
+    if call.cached:
+        return
+    LLM_TOKENS.labels(*labels, "prompt").inc(call.prompt_tokens)
+    LLM_TOKENS.labels(*labels, "completion").inc(call.completion_tokens)
+    LLM_RETRIES.labels(*labels).inc(call.retries)
+    LLM_VALIDATION_FAILURES.labels(*labels).inc(call.validation_failures)
+    LLM_LATENCY.labels(*labels).observe(call.latency_seconds)
+
+
+def record_backend_request(backend: str, outcome: str) -> None:
+    if Counter is not None:
+        LLM_BACKEND_REQUESTS.labels(backend, outcome).inc()
+
+
+def set_concurrency(limiter: str, limit: int, in_flight: int) -> None:
+    if Gauge is None:
+        return
+    LLM_CONCURRENCY_LIMIT.labels(limiter).set(limit)
+    LLM_IN_FLIGHT.labels(limiter).set(in_flight)
+
+
+def start_metrics_server(port: int) -> None:
+    if not port:
+        return
+    if start_http_server is None:
+        logger.warning("prometheus_client is not installed; LLM metrics endpoint disabled")
+        return
+    start_http_server(port)
+    logger.info(f"Serving Prometheus metrics on :{port}/metrics")
@@ -0,0 +1,135 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Optional
+
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed documents, keyed on a hash of the PDF content.
+
+    Payloads are msgpack-encoded dicts stored as <root>/<version>/<key>.msgpack.
+    Bumping `version` (DocumentParserService's PARSER_VERSION) invalidates every
+    existing entry; directories of other versions are removed on first write.
+    When the entries exceed `max_bytes`, least recently used ones (by mtime,
+    which reads refresh) are evicted.
+    """
+
+    def __init__(self, root: str, version: str, max_bytes: int = 0):
+        self.root = root
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._pruned = False
+        self._size: Optional[int] = None  # estimate; rescanned when it passes max_bytes
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(path: str, block_size: int = 1024 * 1024) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, self.version, f"{key}.msgpack")
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key), "rb") as f:
+                payload = msgpack.unpackb(f.read(), raw=False)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable parse cache entry {key}: {type(e).__name__}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass  # evicted by another process in the meantime
+        return payload
+
+    def put(self, key: str, payload: dict) -> None:
+        if not self._pruned:
+            self._prune_stale_versions()
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # PDF metadata can hold pdfminer objects (PSLiteral etc.); store those as strings
+        data = msgpack.packb(payload, use_bin_type=True, default=str)
+        # A private temp file per writer: workers parsing the same PDF must not interleave writes
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            if self.max_bytes and self._size is None:
+                self._size = self._scan_size()
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if self.max_bytes:
+            self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list:
+        directory = os.path.join(self.root, self.version)
+        entries = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.endswith(".msgpack"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is back under 90% of max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._size = total
+        logger.info(f"Evicted {evicted} parse cache entries")
+
+    def _prune_stale_versions(self) -> None:
+        self._pruned = True
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.listdir(self.root):
+            if entry != self.version:
+                logger.info(f"Removing parse cache for parser version {entry}")
+                shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
@@ -0,0 +1,126 @@
+import os
+import uuid
+import asyncio
+import logging
+from functools import partial
+from typing import List, Optional, Tuple
+
+from src.config import settings
+from src.models.db import IngestionStage
+from src.models.schema import UniversityExtraction
+
+from src.services.blob_storage import blob_storage
+from src.services.document_parser import document_parser_service
+from src.services.chunker import chunker_service, TextChunk
+from src.services.chunk_diff import ChunkDiff, diff_chunks
+from src.services.embedding import embedding_service
+from src.services.llm_client import extraction_service, STAGE_MODELS
+from src.services.checkpoint_store import checkpoint_store
+from src.services.job_queue import ExtractionJob
+from src.repositories.prospectus_repository import prospectus_repository, BulkWriteStats
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionPipeline:
+    """
+    Runs one ingestion end to end: download, parse, chunk, embed, extract, persist.
+
+    Drives the ingestion's status (pending/failed -> processing -> completed/failed)
+    and checkpoints every stage, so a retried ingestion resumes after the last
+    completed stage instead of repeating parsing and LLM calls. When the university
+    has a previously completed ingestion, only chunks changed since that revision
+    are re-extracted.
+    """
+
+    def __init__(self, blob_storage=blob_storage, parser=document_parser_service, chunker=chunker_service,
+                 embedder=embedding_service, extractor=extraction_service, repository=prospectus_repository,
+                 checkpoints=checkpoint_store, incremental: bool = settings.incremental_extraction):
+        self.blob_storage = blob_storage
+        self.parser = parser
+        self.chunker = chunker
+        self.embedder = embedder
+        self.extractor = extractor
+        self.repository = repository
+        self.checkpoints = checkpoints
+        self.incremental = incremental
+
+    async def run(self, job: ExtractionJob) -> Optional[BulkWriteStats]:
+        ingestion_id = uuid.UUID(job.ingestion_id)
+        if not await asyncio.to_thread(self.repository.begin_processing, ingestion_id):
+            return None
+
+        try:
+            stats = await self._run_stages(ingestion_id, job)
+        except Exception as e:
+            await asyncio.to_thread(self.repository.mark_failed, ingestion_id, f"{type(e).__name__}: {e}")
+            raise
+
+        await asyncio.to_thread(self.repository.mark_completed, ingestion_id)
+        self.checkpoints.clear(ingestion_id)
+        return stats
+
+    async def _run_stages(self, ingestion_id: uuid.UUID, job: ExtractionJob) -> BulkWriteStats:
+        completed = set(self.checkpoints.completed_stages(ingestion_id))
+        if completed:
+            logger.info(f"[{ingestion_id}] Resuming; checkpointed stages: {sorted(completed)}")
+
+        if IngestionStage.CHUNKED.value in completed:
+            chunks = self.checkpoints.load_chunks(ingestion_id)
+        else:
+            if IngestionStage.PARSED.value in completed:
+                document = self.checkpoints.load_parsed(ingestion_id)
+            else:
+                logger.info(f"[{ingestion_id}] Downloading {job.blob_name}")
+                pdf_path = await self.blob_storage.download_to_file(job.blob_name)
+                try:
+                    logger.info(f"[{ingestion_id}] Parsing")
+                    document = await self.parser.parse_pdf_file(pdf_path)
+                finally:
+                    os.unlink(pdf_path)
+                await asyncio.to_thread(self.checkpoints.save_parsed, ingestion_id, document)
+
+            logger.info(f"[{ingestion_id}] Chunking {document.total_pages} pages")
+            chunks = await asyncio.to_thread(self.chunker.chunk_document, document)
+            await asyncio.to_thread(self.checkpoints.save_chunks, ingestion_id, chunks)
+
+        if IngestionStage.EMBEDDED.value in completed:
+            embeddings = self.checkpoints.load_embeddings(ingestion_id)
+        else:
+            logger.info(f"[{ingestion_id}] Embedding {len(chunks)} chunks")
+            embeddings = await self.embedder.embed_chunks(chunks)
+            await asyncio.to_thread(self.checkpoints.save_embeddings, ingestion_id, embeddings)
+
+        previous, diff = await self._previous_revision(ingestion_id, chunks) if self.incremental else (None, None)
+
+        logger.info(f"[{ingestion_id}] Extracting")
+        extraction = await self.extractor.extract_all(
+            chunks,
+            embeddings=embeddings,
+            resume=self.checkpoints.load_sections(ingestion_id, STAGE_MODELS),
+            on_stage_complete=partial(self.checkpoints.save_section, ingestion_id),
+            previous=previous,
+            diff=diff,
+        )
+
+        return await asyncio.to_thread(
+            self.repository.save_ingestion_results, ingestion_id, chunks, embeddings, extraction
+        )
+
+    async def _previous_revision(
+        self, ingestion_id: uuid.UUID, chunks: List[TextChunk]
+    ) -> Tuple[Optional[UniversityExtraction], Optional[ChunkDiff]]:
+        """The previous revision's extraction and the chunk diff against it, if there is one."""
+        previous_id = await asyncio.to_thread(self.repository.find_previous_ingestion, ingestion_id)
+        if previous_id is None:
+            return None, None
+        extraction = await asyncio.to_thread(self.repository.load_extraction, previous_id)
+        if extraction is None:
+            return None, None
+        previous_chunks = await asyncio.to_thread(self.repository.load_chunks, previous_id)
+        diff = diff_chunks(previous_chunks, chunks)
+        logger.info(f"[{ingestion_id}] Previous revision {previous_id}: {diff.summary()}")
+        return extraction, diff
+
+
+ingestion_pipeline = IngestionPipeline()
@@ -0,0 +1,71 @@
+import logging
+from functools import lru_cache
+from typing import Callable, List
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough English average, used only when no tokenizer library is installed
+CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """
+    Token counting for prompt budgeting.
+
+    Uses the Hugging Face tokenizer named by `llm_tokenizer` (e.g.
+    "meta-llama/Llama-3.1-8B-Instruct") when set and the `tokenizers` package
+    is available, otherwise tiktoken's cl100k_base (close to Llama 3's
+    vocabulary), otherwise a characters-per-token estimate.
+    """
+
+    def __init__(self, tokenizer_name: str = settings.llm_tokenizer):
+        self.backend, count = self._load(tokenizer_name)
+        # Chunk texts are counted once per section they are considered for
+        self._count = lru_cache(maxsize=32768)(count)
+
+    @staticmethod
+    def _load(tokenizer_name: str):
+        if tokenizer_name:
+            try:
+                from tokenizers import Tokenizer
+                tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+                logger.info(f"Counting tokens with {tokenizer_name}")
+                return tokenizer_name, lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer {tokenizer_name}: {type(e).__name__}: {e}")
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding("cl100k_base")
+            return "cl100k_base", lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable ({type(e).__name__}); estimating tokens from character count")
+            return "chars", lambda text: -(-len(text) // CHARS_PER_TOKEN)
+
+    def count(self, text: str) -> int:
+        return self._count(text)
+
+
+def pack_by_tokens(texts: List[str], budget: int, count: Callable[[str], int], separator_tokens: int = 2) -> List[List[int]]:
+    """
+    Greedily group consecutive texts into batches whose token total stays within
+    `budget`. Returns index lists. A text that exceeds the budget on its own gets
+    a batch to itself rather than being cut.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for index, text in enumerate(texts):
+        cost = count(text) + separator_tokens
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+token_counter = TokenCounter()
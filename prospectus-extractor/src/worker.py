@@ -0,0 +1,141 @@
+"""
+Long-running consumer for the prospectus extraction queue.
+Usage: python -m src.worker
+"""
+import signal
+import asyncio
+import logging
+from typing import Awaitable, Optional, Set
+
+from src.config import settings
+from src.services.job_queue import JobQueue, ReceivedJob, ServiceBusJobQueue
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionWorker:
+    """
+    Pulls jobs from a JobQueue and runs up to `concurrency` ingestions at once.
+
+    Message locks are renewed on a timer for as long as a job runs, so hour-long
+    LLM phases don't let the message reappear on the queue. A failed job is
+    abandoned for redelivery until it has been delivered `max_delivery_count`
+    times, then dead-lettered.
+    """
+
+    def __init__(self, queue: JobQueue, pipeline, concurrency: int = settings.worker_concurrency,
+                 max_wait_time: float = settings.worker_max_wait_time,
+                 lock_renew_interval: float = settings.worker_lock_renew_interval,
+                 max_delivery_count: int = settings.worker_max_delivery_count):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.concurrency = concurrency
+        self.max_wait_time = max_wait_time
+        self.lock_renew_interval = lock_renew_interval
+        self.max_delivery_count = max_delivery_count
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        stop = stop or asyncio.Event()
+        in_flight: Set[asyncio.Task] = set()
+        logger.info(f"Worker started (concurrency={self.concurrency})")
+
+        while not stop.is_set():
+            free_slots = self.concurrency - len(in_flight)
+            if free_slots <= 0:
+                await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            try:
+                received = await self.queue.receive(free_slots, self.max_wait_time)
+            except Exception as e:
+                logger.error(f"Receive failed: {type(e).__name__}: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            for item in received:
+                task = asyncio.create_task(self._handle(item))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            logger.info(f"Stopping: waiting for {len(in_flight)} in-flight jobs")
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        logger.info("Worker stopped")
+
+    async def _renew_lock_periodically(self, item: ReceivedJob) -> None:
+        while True:
+            await asyncio.sleep(self.lock_renew_interval)
+            try:
+                await self.queue.renew_lock(item)
+            except Exception as e:
+                logger.warning(f"[{item.job.ingestion_id}] Lock renewal failed: {type(e).__name__}: {e}")
+
+    async def _handle(self, item: ReceivedJob) -> None:
+        job = item.job
+        logger.info(f"[{job.ingestion_id}] Job received (delivery {item.delivery_count})")
+        renewer = asyncio.create_task(self._renew_lock_periodically(item))
+        try:
+            await self.pipeline.run(job)
+        except Exception as e:
+            failure: Optional[Exception] = e
+        else:
+            failure = None
+        finally:
+            renewer.cancel()
+
+        if failure is None:
+            await self._settle(item, "completed", self.queue.complete(item))
+            return
+        logger.error(f"[{job.ingestion_id}] Job failed: {type(failure).__name__}: {failure}")
+        reason = f"{type(failure).__name__}: {failure}"
+        if item.delivery_count >= self.max_delivery_count:
+            await self._settle(item, "dead-lettered", self.queue.dead_letter(item, reason))
+        else:
+            await self._settle(item, "abandoned", self.queue.abandon(item))
+
+    async def _settle(self, item: ReceivedJob, outcome: str, settlement: Awaitable[None]) -> None:
+        """Await a complete/abandon/dead-letter call; a failure is logged, as nothing else observes this task."""
+        try:
+            await settlement
+        except Exception as e:
+            logger.error(
+                f"[{item.job.ingestion_id}] Could not settle message as {outcome}: {type(e).__name__}: {e}; "
+                f"it will be redelivered when its lock expires"
+            )
+            return
+        logger.info(f"[{item.job.ingestion_id}] Job {outcome}")
+
+
+async def main():
+    # Imported here so the worker class can be used with a fake queue and pipeline
+    # without constructing the real service singletons
+    from src.services.pipeline import ingestion_pipeline
+    from src.services.blob_storage import blob_storage
+    from src.services.embedding import embedding_service
+    from src.services import llm_telemetry
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s - %(levelname)s - %(message)s')
+    llm_telemetry.start_metrics_server(settings.metrics_port)
+    queue = ServiceBusJobQueue(
+        settings.azure_servicebus_connection_string,
+        settings.azure_servicebus_queue_name,
+        # A message buffered beyond the free slots would sit unrenewed until its lock expired
+        prefetch_count=min(settings.worker_prefetch_count, settings.worker_concurrency),
+    )
+    worker = ExtractionWorker(queue, ingestion_pipeline)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await worker.run(stop)
+    finally:
+        await queue.close()
+        await blob_storage.close()
+        await embedding_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())